@@ -2,10 +2,13 @@
 Image Processing Client - Demonstrates the complete pipeline with batch processing
 """
 import grpc
+import asyncio
+import functools
 import sys
 import os
 import time
 import shutil
+import numpy as np
 from PIL import Image, ImageDraw
 from io import BytesIO
 
@@ -20,19 +23,38 @@ sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'
 import image_processing_pb2
 import image_processing_pb2_grpc
 
+# Keep the HTTP/2 connection warm between batches and allow large raw frames
+CHANNEL_OPTIONS = [
+    ('grpc.keepalive_time_ms', 10000),
+    ('grpc.keepalive_timeout_ms', 2000),
+    ('grpc.http2.max_pings_without_data', 0),
+    ('grpc.max_send_message_length', 64 * 1024 * 1024),
+    ('grpc.max_receive_message_length', 64 * 1024 * 1024),
+]
+
+# Raw pixels skip zlib on both ends but are several times larger than PNG on
+# the wire; only worth it when the orchestrator and workers are on one machine
+LOCAL_FAST = os.environ.get('LOCAL_FAST') == '1'
+
+# File extensions that already match what the server encoded
+FORMAT_EXTENSIONS = {
+    image_processing_pb2.PNG: ('.png',),
+    image_processing_pb2.JPEG: ('.jpg', '.jpeg'),
+    image_processing_pb2.WEBP: ('.webp',),
+}
+
 
 def create_sample_image(width=1920, height=1080):
     """Create a sample image for processing"""
-    image = Image.new('RGB', (width, height))
+    # Gradient background (built as one array instead of one rectangle per row)
+    ys = np.arange(height) / height
+    gradient = np.empty((height, width, 3), dtype=np.uint8)
+    gradient[..., 0] = (255 * ys).astype(np.uint8)[:, None]
+    gradient[..., 1] = 128
+    gradient[..., 2] = (255 * (1 - ys)).astype(np.uint8)[:, None]
+    image = Image.fromarray(gradient, 'RGB')
     draw = ImageDraw.Draw(image)
     
-    # Gradient background
-    for y in range(height):
-        r = int(255 * (y / height))
-        g = int(128)
-        b = int(255 * (1 - y / height))
-        draw.rectangle([0, y, width, y + 1], fill=(r, g, b))
-    
     # Shapes (scaled to image size)
     scale_x = width / 1920
     scale_y = height / 1080
@@ -47,12 +69,10 @@ def create_sample_image(width=1920, height=1080):
     
     return image
 
-def process_image(stub, image_data, filename, target_width=0, target_height=0, filters=None, watermark_text=None, output_format=image_processing_pb2.PNG, output_quality=90):
-    """Helper to send a request and print results"""
-    if filters is None: filters = []
-    
-    # Create options
-    options = image_processing_pb2.ProcessingOptions(
+@functools.lru_cache(maxsize=64)
+def build_options(target_width, target_height, filters, watermark_text, output_format, output_quality):
+    """Helper to build (once per parameter set) the options; filters must be a tuple"""
+    return image_processing_pb2.ProcessingOptions(
         target_width=target_width,
         target_height=target_height,
         filters=filters,
@@ -63,25 +83,39 @@ def process_image(stub, image_data, filename, target_width=0, target_height=0, f
         output_quality=output_quality
     )
 
-    response = stub.ProcessImage(
-        image_processing_pb2.ProcessRequest(
-            filename=filename,
-            image_data=image_data,
-            options=options
-        )
+
+def build_request(image_data, filename, target_width=0, target_height=0, filters=None, watermark_text=None, output_format=image_processing_pb2.PNG, output_quality=90, raw_info=None):
+    """Helper to build the request for one image"""
+    # The batch only cycles through a handful of option sets, so reuse them
+    options = build_options(target_width, target_height, tuple(filters or ()),
+                            watermark_text, output_format, output_quality)
+
+    return image_processing_pb2.ProcessRequest(
+        filename=filename,
+        image_data=image_data,
+        options=options,
+        raw_info=raw_info
     )
-    
+
+
+def save_result(response, filename, output_format=image_processing_pb2.PNG):
+    """Helper to save one response; returns (success, message to print)"""
     if response.success:
-        # Save result
-        result_img = Image.open(BytesIO(response.processed_image))
-        result_img.save(filename)
+        processed_image = response.processed_image
+        ext = os.path.splitext(filename)[1].lower()
+        if ext in FORMAT_EXTENSIONS.get(output_format, ()):
+            # Save result - the server already encoded it in output_format
+            with open(filename, 'wb') as f:
+                f.write(processed_image)
+        else:
+            # Extension asks for a different format, let Pillow convert
+            Image.open(BytesIO(processed_image)).save(filename)
         
-        print(f"✅ Success! Total: {response.stats.total_time_ms}ms | Saved: {filename}")
-    else:
-        print(f"❌ FAILED: {response.message}")
+        return True, f"✅ Success! Total: {response.stats.total_time_ms}ms | Saved: {filename}"
+    return False, f"❌ FAILED: {filename} - {response.message}"
 
 
-def run_pipeline_demo():
+async def run_pipeline_demo():
     print("\n" + "="*80)
     print("🎨 IMAGE PROCESSING PIPELINE - Batch Demo")
     print("="*80 + "\n")
@@ -96,7 +130,7 @@ def run_pipeline_demo():
     
     # Connect to Orchestrator
     print("🔌 Connecting to Orchestrator Service (port 50055)...")
-    channel = grpc.insecure_channel('localhost:50055')
+    channel = grpc.aio.insecure_channel('localhost:50055', options=CHANNEL_OPTIONS)
     stub = image_processing_pb2_grpc.OrchestratorServiceStub(channel)
     
     # Batch processing configuration
@@ -109,27 +143,33 @@ def run_pipeline_demo():
     print(f"🚀 BATCH PROCESSING: {NUM_IMAGES} Images")
     print("="*80)
     
-    try:
-        for i in range(1, NUM_IMAGES + 1):
-            print(f"\n🎯 IMAGE {i}/{NUM_IMAGES}: ", end='', flush=True)
-            
-            # Create sample image (vary the size for diversity)
-            sizes = [(1920, 1080), (1280, 720), (1600, 900), (2560, 1440)]
-            width, height = sizes[i % len(sizes)]
-            sample_image = create_sample_image(width, height)
-            
-            # Convert to bytes
+    # Vary the processing parameters
+    sizes = [(1920, 1080), (1280, 720), (1600, 900), (2560, 1440)]
+    filter_sets = [
+        [image_processing_pb2.BLUR, image_processing_pb2.SHARPEN],
+        [image_processing_pb2.SEPIA],
+        [image_processing_pb2.BRIGHTNESS, image_processing_pb2.CONTRAST],
+        [image_processing_pb2.GRAYSCALE],
+    ]
+    
+    # Create each sample image once; the batch only cycles through these sizes
+    inputs = {}
+    for width, height in sizes:
+        sample_image = create_sample_image(width, height)
+        if LOCAL_FAST:
+            raw_info = image_processing_pb2.RawImageInfo(width=width, height=height, mode=sample_image.mode)
+            inputs[(width, height)] = (sample_image.tobytes(), raw_info)
+        else:
+            # The input is throwaway for the server, so use the fastest zlib level
             img_buffer = BytesIO()
-            sample_image.save(img_buffer, format='PNG')
-            img_bytes = img_buffer.getvalue()
+            sample_image.save(img_buffer, format='PNG', compress_level=1)
+            inputs[(width, height)] = (img_buffer.getvalue(), None)
+    
+    def batch_requests():
+        for i in range(1, NUM_IMAGES + 1):
+            # Vary the size for diversity
+            img_bytes, raw_info = inputs[sizes[i % len(sizes)]]
             
-            # Vary the processing parameters
-            filter_sets = [
-                [image_processing_pb2.BLUR, image_processing_pb2.SHARPEN],
-                [image_processing_pb2.SEPIA],
-                [image_processing_pb2.BRIGHTNESS, image_processing_pb2.CONTRAST],
-                [image_processing_pb2.GRAYSCALE],
-            ]
             filters = filter_sets[i % len(filter_sets)]
             
             watermarks = [
@@ -140,21 +180,43 @@ def run_pipeline_demo():
             ]
             watermark = watermarks[i % len(watermarks)]
             
-            try:
-                process_image(
-                    stub,
-                    img_bytes,
-                    f"output/batch_{i:03d}.png",
-                    target_width=1280,
-                    target_height=720,
-                    filters=filters,
-                    watermark_text=watermark,
-                    output_format=image_processing_pb2.PNG,
-                    output_quality=90
-                )
+            yield build_request(
+                img_bytes,
+                f"output/batch_{i:03d}.png",
+                target_width=1280,
+                target_height=720,
+                filters=filters,
+                watermark_text=watermark,
+                output_format=image_processing_pb2.PNG,
+                output_quality=90,
+                raw_info=raw_info
+            )
+    
+    async def save(i, response):
+        # Write to disk on a worker thread while the next response is read;
+        # a failed save only counts this image as failed. Print
+        # here on the event loop so lines from concurrent saves don't mix.
+        try:
+            saved, message = await asyncio.to_thread(
+                save_result, response, f"output/batch_{i:03d}.png", output_format=image_processing_pb2.PNG)
+        except Exception as e:
+            saved, message = False, f"❌ Image {i} failed: {str(e)}"
+        print(message)
+        return saved
+    
+    try:
+        # Stream the whole batch over one call; responses come back in order.
+        # On the aio channel, sending request N+1 overlaps reading response N.
+        i = 0
+        saves = []
+        async for response in stub.ProcessImages(batch_requests()):
+            i += 1
+            saves.append(asyncio.create_task(save(i, response)))
+        
+        for saved in await asyncio.gather(*saves):
+            if saved:
                 successful += 1
-            except Exception as e:
-                print(f"❌ Image {i} failed: {str(e)}")
+            else:
                 failed += 1
         
         # Summary
@@ -178,8 +240,8 @@ def run_pipeline_demo():
         print("\n🔧 Make sure all services are running!")
     
     finally:
-        channel.close()
+        await channel.close()
 
 
 if __name__ == '__main__':
-    run_pipeline_demo()
+    asyncio.run(run_pipeline_demo())
@@ -4,11 +4,15 @@ Image Processing Pipeline GUI - Control Panel
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 import threading
+import functools
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import grpc
 import sys
 import os
 import time
 import shutil
+import numpy as np
 from PIL import Image, ImageDraw
 from io import BytesIO
 
@@ -18,19 +22,33 @@ sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'
 import image_processing_pb2
 import image_processing_pb2_grpc
 
+# Keep the HTTP/2 connection warm between runs and allow large images
+CHANNEL_OPTIONS = [
+    ('grpc.keepalive_time_ms', 10000),
+    ('grpc.keepalive_timeout_ms', 2000),
+    ('grpc.http2.max_pings_without_data', 0),
+    ('grpc.max_send_message_length', 64 * 1024 * 1024),
+    ('grpc.max_receive_message_length', 64 * 1024 * 1024),
+]
+
+# Images sent to the orchestrator at once
+BATCH_WORKERS = 8
+
+# Send raw pixels instead of PNG; only worth it when every service is local
+LOCAL_FAST = os.environ.get('LOCAL_FAST') == '1'
+
 
 def create_sample_image(width=1920, height=1080):
     """Create a sample image for processing"""
-    image = Image.new('RGB', (width, height))
+    # Gradient background (built as one array instead of one rectangle per row)
+    ys = np.arange(height) / height
+    gradient = np.empty((height, width, 3), dtype=np.uint8)
+    gradient[..., 0] = (255 * ys).astype(np.uint8)[:, None]
+    gradient[..., 1] = 128
+    gradient[..., 2] = (255 * (1 - ys)).astype(np.uint8)[:, None]
+    image = Image.fromarray(gradient, 'RGB')
     draw = ImageDraw.Draw(image)
     
-    # Gradient background
-    for y in range(height):
-        r = int(255 * (y / height))
-        g = int(128)
-        b = int(255 * (1 - y / height))
-        draw.rectangle([0, y, width, y + 1], fill=(r, g, b))
-    
     # Shapes (scaled to image size)
     scale_x = width / 1920
     scale_y = height / 1080
@@ -46,6 +64,20 @@ def create_sample_image(width=1920, height=1080):
     return image
 
 
+@functools.lru_cache(maxsize=8)
+def sample_input(width, height):
+    """Encode the sample image once per size; returns (image_data, raw_info)"""
+    sample_image = create_sample_image(width, height)
+    if LOCAL_FAST:
+        raw_info = image_processing_pb2.RawImageInfo(width=width, height=height, mode=sample_image.mode)
+        return sample_image.tobytes(), raw_info
+    
+    # The input is throwaway for the server, so use the fastest zlib level
+    img_buffer = BytesIO()
+    sample_image.save(img_buffer, format='PNG', compress_level=1)
+    return img_buffer.getvalue(), None
+
+
 class PipelineGUI:
     def __init__(self, root):
         self.root = root
@@ -57,8 +89,17 @@ class PipelineGUI:
         self.container_mode_var = tk.StringVar(value="single")
         self.is_running = False
         
+        # One orchestrator connection, reused by every run
+        self.channel = grpc.insecure_channel('localhost:50055', options=CHANNEL_OPTIONS)
+        self.stub = image_processing_pb2_grpc.OrchestratorServiceStub(self.channel)
+        
         self.create_widgets()
         
+        # Worker threads queue log lines and widget updates; the Tk thread
+        # applies them in batches
+        self.log_queue = queue.Queue()
+        self.root.after(50, self.drain_log)
+        
     def create_widgets(self):
         # Main frame
         main_frame = ttk.Frame(self.root, padding="10")
@@ -131,10 +172,30 @@ class PipelineGUI:
         main_frame.rowconfigure(5, weight=1)
         
     def log(self, message):
-        """Add message to log text area"""
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        """Add message to log text area (safe to call from any thread)"""
+        self.log_queue.put(message)
+        
+    def update(self, widget, **options):
+        """Configure a widget from the Tk thread (safe to call from any thread)"""
+        self.log_queue.put(functools.partial(widget.config, **options))
+        
+    def drain_log(self):
+        """Append queued log lines and apply queued widget updates, then reschedule"""
+        lines = []
+        try:
+            for _ in range(200):
+                item = self.log_queue.get_nowait()
+                if callable(item):
+                    item()
+                else:
+                    lines.append(item)
+        except queue.Empty:
+            pass
+        
+        if lines:
+            self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+            self.log_text.see(tk.END)
+        self.root.after(50, self.drain_log)
         
     def clear_output(self):
         """Clear output folder"""
@@ -158,17 +219,67 @@ class PipelineGUI:
         # Clear log
         self.log_text.delete(1.0, tk.END)
         
+        # Tk variables may only be read here, on the Tk thread
+        num_images = self.num_images_var.get()
+        mode = self.container_mode_var.get()
+        
         # Start processing in thread
-        thread = threading.Thread(target=self.run_batch_processing)
+        thread = threading.Thread(target=self.run_batch_processing, args=(num_images, mode))
         thread.daemon = True
         thread.start()
         
-    def run_batch_processing(self):
+    def _process_one(self, i, size, filters, watermark):
+        """Send one image through the pipeline and save the result"""
+        # Create sample image
+        img_bytes, raw_info = sample_input(*size)
+        
+        # Create options
+        options = image_processing_pb2.ProcessingOptions(
+            target_width=1280,
+            target_height=720,
+            filters=filters,
+            add_watermark=True,
+            watermark_text=watermark,
+            watermark_position="bottom-right",
+            output_format=image_processing_pb2.PNG,
+            output_quality=90
+        )
+        
+        chunks = self.stub.ProcessImageStream(
+            image_processing_pb2.ProcessRequest(
+                filename=f"output/batch_{i:03d}.png",
+                image_data=img_bytes,
+                options=options,
+                raw_info=raw_info
+            )
+        )
+        
+        # The orchestrator already returns the final PNG bytes;
+        # write each chunk as it arrives instead of holding the image
+        output_path = f"output/batch_{i:03d}.png"
+        response = None
+        try:
+            with open(output_path, 'wb') as f:
+                for chunk in chunks:
+                    if chunk.HasField('result'):
+                        response = chunk.result
+                    else:
+                        f.write(chunk.data)
+            if response is None:
+                raise RuntimeError("stream ended without a result")
+        except Exception:
+            # Do not leave a truncated image behind
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        
+        if not response.success:
+            os.remove(output_path)
+        return response
+    
+    def run_batch_processing(self, num_images, mode):
         """Run the batch processing"""
         try:
-            num_images = self.num_images_var.get()
-            mode = self.container_mode_var.get()
-            
             self.log("="*80)
             self.log(f"🚀 BATCH PROCESSING: {num_images} Images | Mode: {mode.upper()}")
             self.log("="*80)
@@ -181,82 +292,53 @@ class PipelineGUI:
             os.makedirs(output_dir)
             self.log("✅ Output folder ready\n")
             
-            # Update status
-            self.status_label.config(text=f"Processing {num_images} images...")
+            # Update status (Tk widgets belong to the main thread, so every
+            # update from this worker thread goes through the log queue)
+            self.update(self.status_label, text=f"Processing {num_images} images...")
             
             # Connect to Orchestrator
             self.log("🔌 Connecting to Orchestrator Service (port 50055)...")
-            channel = grpc.insecure_channel('localhost:50055')
-            stub = image_processing_pb2_grpc.OrchestratorServiceStub(channel)
-            
             successful = 0
             failed = 0
             total_start_time = time.time()
             
             # Reset progress
-            self.progress['maximum'] = num_images
-            self.progress['value'] = 0
+            self.update(self.progress, maximum=num_images, value=0)
             
+            # Vary sizes, filters and watermarks across the batch
+            sizes = [(1920, 1080), (1280, 720), (1600, 900), (2560, 1440)]
+            filter_sets = [
+                [image_processing_pb2.BLUR, image_processing_pb2.SHARPEN],
+                [image_processing_pb2.SEPIA],
+                [image_processing_pb2.BRIGHTNESS, image_processing_pb2.CONTRAST],
+                [image_processing_pb2.GRAYSCALE],
+            ]
+            work = []
             for i in range(1, num_images + 1):
-                self.log(f"\n🎯 IMAGE {i}/{num_images}: Processing...")
-                
-                # Create sample image
-                sizes = [(1920, 1080), (1280, 720), (1600, 900), (2560, 1440)]
-                width, height = sizes[i % len(sizes)]
-                sample_image = create_sample_image(width, height)
-                
-                img_buffer = BytesIO()
-                sample_image.save(img_buffer, format='PNG')
-                img_bytes = img_buffer.getvalue()
-                
-                # Vary filters
-                filter_sets = [
-                    [image_processing_pb2.BLUR, image_processing_pb2.SHARPEN],
-                    [image_processing_pb2.SEPIA],
-                    [image_processing_pb2.BRIGHTNESS, image_processing_pb2.CONTRAST],
-                    [image_processing_pb2.GRAYSCALE],
-                ]
-                filters = filter_sets[i % len(filter_sets)]
-                
                 watermarks = [f"Image #{i}", "Batch Processing", "Distributed Pipeline", "gRPC Demo"]
-                watermark = watermarks[i % len(watermarks)]
+                work.append((i, sizes[i % len(sizes)], filter_sets[i % len(filter_sets)],
+                             watermarks[i % len(watermarks)]))
+            
+            # Keep several images in flight; the channel is shared by all workers
+            with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as executor:
+                pending = {executor.submit(self._process_one, *args): args[0] for args in work}
                 
-                try:
-                    # Create options
-                    options = image_processing_pb2.ProcessingOptions(
-                        target_width=1280,
-                        target_height=720,
-                        filters=filters,
-                        add_watermark=True,
-                        watermark_text=watermark,
-                        watermark_position="bottom-right",
-                        output_format=image_processing_pb2.PNG,
-                        output_quality=90
-                    )
-                    
-                    response = stub.ProcessImage(
-                        image_processing_pb2.ProcessRequest(
-                            filename=f"output/batch_{i:03d}.png",
-                            image_data=img_bytes,
-                            options=options
-                        )
-                    )
-                    
-                    if response.success:
-                        result_img = Image.open(BytesIO(response.processed_image))
-                        result_img.save(f"output/batch_{i:03d}.png")
-                        self.log(f"✅ Success! Total: {response.stats.total_time_ms}ms")
-                        successful += 1
-                    else:
-                        self.log(f"❌ FAILED: {response.message}")
+                for done, future in enumerate(as_completed(pending), 1):
+                    i = pending[future]
+                    try:
+                        response = future.result()
+                        if response.success:
+                            self.log(f"✅ Image {i}: Success! Total: {response.stats.total_time_ms}ms")
+                            successful += 1
+                        else:
+                            self.log(f"❌ Image {i} FAILED: {response.message}")
+                            failed += 1
+                    except Exception as e:
+                        self.log(f"❌ Image {i} failed: {str(e)}")
                         failed += 1
-                        
-                except Exception as e:
-                    self.log(f"❌ Image {i} failed: {str(e)}")
-                    failed += 1
-                
-                # Update progress
-                self.progress['value'] = i
+                    
+                    # Update progress
+                    self.update(self.progress, value=done)
                 
             # Summary
             total_time = time.time() - total_start_time
@@ -271,17 +353,15 @@ class PipelineGUI:
             self.log(f"   Throughput:        {num_images/total_time:.2f} images/second")
             self.log("="*80)
             
-            self.status_label.config(text=f"✅ Complete! {successful}/{num_images} successful")
-            
-            channel.close()
+            self.update(self.status_label, text=f"✅ Complete! {successful}/{num_images} successful")
             
         except Exception as e:
             self.log(f"\n❌ Error: {str(e)}")
-            self.status_label.config(text="❌ Processing failed")
+            self.update(self.status_label, text="❌ Processing failed")
         
         finally:
             # Re-enable start button
-            self.start_button.config(state='normal')
+            self.update(self.start_button, state='normal')
             self.is_running = False
 
 
@@ -289,6 +369,7 @@ def main():
     root = tk.Tk()
     app = PipelineGUI(root)
     root.mainloop()
+    app.channel.close()
 
 
 if __name__ == '__main__':
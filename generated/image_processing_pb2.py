@@ -14,7 +14,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16image_processing.proto\x12\x10image_processing\"y\n\nImageChunk\x12\x0c\n\x04\x64\x61ta\x18\x01 \x01(\x0c\x12\x14\n\x0c\x63hunk_number\x18\x02 \x01(\x05\x12\x14\n\x0ctotal_chunks\x18\x03 \x01(\x05\x12\x31\n\x08metadata\x18\x04 \x01(\x0b\x32\x1f.image_processing.ImageMetadata\"v\n\rImageMetadata\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x10\n\x08\x66ilename\x18\x02 \x01(\t\x12\x0e\n\x06\x66ormat\x18\x03 \x01(\t\x12\r\n\x05width\x18\x04 \x01(\x05\x12\x0e\n\x06height\x18\x05 \x01(\x05\x12\x12\n\nsize_bytes\x18\x06 \x01(\x03\"w\n\x0eUploadResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x10\n\x08image_id\x18\x03 \x01(\t\x12\x31\n\x08metadata\x18\x04 \x01(\x0b\x32\x1f.image_processing.ImageMetadata\"D\n\x12ValidationResponse\x12\r\n\x05valid\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x0e\n\x06issues\x18\x03 \x03(\t\"\x81\x01\n\rResizeRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x14\n\x0ctarget_width\x18\x03 \x01(\x05\x12\x15\n\rtarget_height\x18\x04 \x01(\x05\x12\x1d\n\x15maintain_aspect_ratio\x18\x05 \x01(\x08\"\x8c\x01\n\x0eResizeResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x15\n\rresized_image\x18\x03 \x01(\x0c\x12\x11\n\tnew_width\x18\x04 \x01(\x05\x12\x12\n\nnew_height\x18\x05 \x01(\x05\x12\x1a\n\x12processing_time_ms\x18\x06 \x01(\x03\"F\n\x10ThumbnailRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x0c\n\x04size\x18\x03 \x01(\x05\"H\n\tImageData\x12\x0c\n\x04\x64\x61ta\x18\x01 \x01(\x0c\x12\r\n\x05width\x18\x02 \x01(\x05\x12\x0e\n\x06height\x18\x03 \x01(\x05\x12\x0e\n\x06\x66ormat\x18\x04 \x01(\t\"{\n\rFilterRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x31\n\x0b\x66ilter_type\x18\x03 \x01(\x0e\x32\x1c.image_processing.FilterType\x12\x11\n\tintensity\x18\x04 \x01(\x02\"f\n\x0e\x46ilterResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x16\n\x0e\x66iltered_image\x18\x03 \x01(\x0c\x12\x1a\n\x12processing_time_ms\x18\x04 \x01(\x03\"i\n\x12\x42\x61tchFilterRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12-\n\x07\x66ilters\x18\x03 \x03(\x0e\x32\x1c.image_processing.FilterType\"q\n\x13\x42\x61tchFilterResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x16\n\x0e\x66iltered_image\x18\x03 \x01(\x0c\x12 \n\x18total_processing_time_ms\x18\x04 \x01(\x03\"\x8f\x01\n\x14TextWatermarkRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x0c\n\x04text\x18\x03 \x01(\t\x12\x10\n\x08position\x18\x04 \x01(\t\x12\x11\n\tfont_size\x18\x05 \x01(\x05\x12\r\n\x05\x63olor\x18\x06 \x01(\t\x12\x0f\n\x07opacity\x18\x07 \x01(\x02\"\x81\x01\n\x14LogoWatermarkRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x11\n\tlogo_data\x18\x03 \x01(\x0c\x12\x10\n\x08position\x18\x04 \x01(\t\x12\r\n\x05scale\x18\x05 \x01(\x02\x12\x0f\n\x07opacity\x18\x06 \x01(\x02\"l\n\x11WatermarkResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x19\n\x11watermarked_image\x18\x03 \x01(\x0c\x12\x1a\n\x12processing_time_ms\x18\x04 \x01(\x05\"u\n\rFormatRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12-\n\x06\x66ormat\x18\x03 \x01(\x0e\x32\x1d.image_processing.ImageFormat\x12\x0f\n\x07quality\x18\x04 \x01(\x05\"g\n\x0e\x46ormatResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x17\n\x0f\x66ormatted_image\x18\x03 \x01(\x0c\x12\x1a\n\x12processing_time_ms\x18\x04 \x01(\x05\"l\n\x0eProcessRequest\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x34\n\x07options\x18\x03 \x01(\x0b\x32#.image_processing.ProcessingOptions\"\x88\x02\n\x11ProcessingOptions\x12\x14\n\x0ctarget_width\x18\x01 \x01(\x05\x12\x15\n\rtarget_height\x18\x02 \x01(\x05\x12-\n\x07\x66ilters\x18\x03 \x03(\x0e\x32\x1c.image_processing.FilterType\x12\x15\n\radd_watermark\x18\x04 \x01(\x08\x12\x16\n\x0ewatermark_text\x18\x05 \x01(\t\x12\x1a\n\x12watermark_position\x18\x06 \x01(\t\x12\x34\n\routput_format\x18\x07 \x01(\x0e\x32\x1d.image_processing.ImageFormat\x12\x16\n\x0eoutput_quality\x18\x08 \x01(\x05\"\x92\x01\n\x0fProcessResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x12\n\nprocess_id\x18\x03 \x01(\t\x12\x17\n\x0fprocessed_image\x18\x04 \x01(\x0c\x12\x30\n\x05stats\x18\x05 \x01(\x0b\x32!.image_processing.ProcessingStats\"\xb8\x02\n\x0fProcessingStats\x12\x16\n\x0eresize_time_ms\x18\x01 \x01(\x05\x12\x16\n\x0e\x66ilter_time_ms\x18\x02 \x01(\x05\x12\x19\n\x11watermark_time_ms\x18\x03 \x01(\x05\x12\x16\n\x0e\x66ormat_time_ms\x18\x04 \x01(\x05\x12\x15\n\rtotal_time_ms\x18\x05 \x01(\x05\x12\x1b\n\x13original_size_bytes\x18\x06 \x01(\x03\x12\x1c\n\x14processed_size_bytes\x18\x07 \x01(\x03\x12@\n\x08host_map\x18\x08 \x03(\x0b\x32..image_processing.ProcessingStats.HostMapEntry\x1a.\n\x0cHostMapEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"#\n\rStatusRequest\x12\x12\n\nprocess_id\x18\x01 \x01(\t\"\x97\x01\n\x0eStatusResponse\x12\x12\n\nprocess_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x18\n\x10progress_percent\x18\x03 \x01(\x05\x12\x15\n\rcurrent_stage\x18\x04 \x01(\t\x12\x30\n\x05stats\x18\x05 \x01(\x0b\x32!.image_processing.ProcessingStats*\x84\x01\n\nFilterType\x12\x08\n\x04NONE\x10\x00\x12\r\n\tGRAYSCALE\x10\x01\x12\x08\n\x04\x42LUR\x10\x02\x12\x0b\n\x07SHARPEN\x10\x03\x12\x0f\n\x0b\x45\x44GE_DETECT\x10\x04\x12\t\n\x05SEPIA\x10\x05\x12\x0c\n\x08NEGATIVE\x10\x06\x12\x0e\n\nBRIGHTNESS\x10\x07\x12\x0c\n\x08\x43ONTRAST\x10\x08**\n\x0bImageFormat\x12\x07\n\x03PNG\x10\x00\x12\x08\n\x04JPEG\x10\x01\x12\x08\n\x04WEBP\x10\x02\x32\xba\x01\n\x0fReceiverService\x12O\n\x0bUploadImage\x12\x1c.image_processing.ImageChunk\x1a .image_processing.UploadResponse(\x01\x12V\n\rValidateImage\x12\x1f.image_processing.ImageMetadata\x1a$.image_processing.ValidationResponse2\xb2\x01\n\rResizeService\x12P\n\x0bResizeImage\x12\x1f.image_processing.ResizeRequest\x1a .image_processing.ResizeResponse\x12O\n\x0cGetThumbnail\x12\".image_processing.ThumbnailRequest\x1a\x1b.image_processing.ImageData2\xbd\x01\n\rFilterService\x12P\n\x0b\x41pplyFilter\x12\x1f.image_processing.FilterRequest\x1a .image_processing.FilterResponse\x12Z\n\x0b\x42\x61tchFilter\x12$.image_processing.BatchFilterRequest\x1a%.image_processing.BatchFilterResponse2\xd4\x01\n\x10WatermarkService\x12_\n\x10\x41\x64\x64TextWatermark\x12&.image_processing.TextWatermarkRequest\x1a#.image_processing.WatermarkResponse\x12_\n\x10\x41\x64\x64LogoWatermark\x12&.image_processing.LogoWatermarkRequest\x1a#.image_processing.WatermarkResponse2c\n\rFormatService\x12R\n\rConvertFormat\x12\x1f.image_processing.FormatRequest\x1a .image_processing.FormatResponse2\xc4\x01\n\x13OrchestratorService\x12S\n\x0cProcessImage\x12 .image_processing.ProcessRequest\x1a!.image_processing.ProcessResponse\x12X\n\x13GetProcessingStatus\x12\x1f.image_processing.StatusRequest\x1a .image_processing.StatusResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16image_processing.proto\x12\x10image_processing\";\n\x0cRawImageInfo\x12\r\n\x05width\x18\x01 \x01(\x05\x12\x0e\n\x06height\x18\x02 \x01(\x05\x12\x0c\n\x04mode\x18\x03 \x01(\t\"y\n\nImageChunk\x12\x0c\n\x04\x64\x61ta\x18\x01 \x01(\x0c\x12\x14\n\x0c\x63hunk_number\x18\x02 \x01(\x05\x12\x14\n\x0ctotal_chunks\x18\x03 \x01(\x05\x12\x31\n\x08metadata\x18\x04 \x01(\x0b\x32\x1f.image_processing.ImageMetadata\"v\n\rImageMetadata\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x10\n\x08\x66ilename\x18\x02 \x01(\t\x12\x0e\n\x06\x66ormat\x18\x03 \x01(\t\x12\r\n\x05width\x18\x04 \x01(\x05\x12\x0e\n\x06height\x18\x05 \x01(\x05\x12\x12\n\nsize_bytes\x18\x06 \x01(\x03\"w\n\x0eUploadResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x10\n\x08image_id\x18\x03 \x01(\t\x12\x31\n\x08metadata\x18\x04 \x01(\x0b\x32\x1f.image_processing.ImageMetadata\"D\n\x12ValidationResponse\x12\r\n\x05valid\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x0e\n\x06issues\x18\x03 \x03(\t\"\xdb\x01\n\rResizeRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x14\n\x0ctarget_width\x18\x03 \x01(\x05\x12\x15\n\rtarget_height\x18\x04 \x01(\x05\x12\x1d\n\x15maintain_aspect_ratio\x18\x05 \x01(\x08\x12\x30\n\x08raw_info\x18\x06 \x01(\x0b\x32\x1e.image_processing.RawImageInfo\x12\x12\n\nraw_output\x18\x07 \x01(\x08\x12\x12\n\nskip_cache\x18\x08 \x01(\x08\"\xbe\x01\n\x0eResizeResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x15\n\rresized_image\x18\x03 \x01(\x0c\x12\x11\n\tnew_width\x18\x04 \x01(\x05\x12\x12\n\nnew_height\x18\x05 \x01(\x05\x12\x1a\n\x12processing_time_ms\x18\x06 \x01(\x03\x12\x30\n\x08raw_info\x18\x07 \x01(\x0b\x32\x1e.image_processing.RawImageInfo\"F\n\x10ThumbnailRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x0c\n\x04size\x18\x03 \x01(\x05\"H\n\tImageData\x12\x0c\n\x04\x64\x61ta\x18\x01 \x01(\x0c\x12\r\n\x05width\x18\x02 \x01(\x05\x12\x0e\n\x06height\x18\x03 \x01(\x05\x12\x0e\n\x06\x66ormat\x18\x04 \x01(\t\"\xc1\x01\n\rFilterRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x31\n\x0b\x66ilter_type\x18\x03 \x01(\x0e\x32\x1c.image_processing.FilterType\x12\x11\n\tintensity\x18\x04 \x01(\x02\x12\x30\n\x08raw_info\x18\x05 \x01(\x0b\x32\x1e.image_processing.RawImageInfo\x12\x12\n\nraw_output\x18\x06 \x01(\x08\"\x98\x01\n\x0e\x46ilterResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x16\n\x0e\x66iltered_image\x18\x03 \x01(\x0c\x12\x1a\n\x12processing_time_ms\x18\x04 \x01(\x03\x12\x30\n\x08raw_info\x18\x05 \x01(\x0b\x32\x1e.image_processing.RawImageInfo\"\xaf\x01\n\x12\x42\x61tchFilterRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12-\n\x07\x66ilters\x18\x03 \x03(\x0e\x32\x1c.image_processing.FilterType\x12\x30\n\x08raw_info\x18\x04 \x01(\x0b\x32\x1e.image_processing.RawImageInfo\x12\x12\n\nraw_output\x18\x05 \x01(\x08\"\xa3\x01\n\x13\x42\x61tchFilterResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x16\n\x0e\x66iltered_image\x18\x03 \x01(\x0c\x12 \n\x18total_processing_time_ms\x18\x04 \x01(\x03\x12\x30\n\x08raw_info\x18\x05 \x01(\x0b\x32\x1e.image_processing.RawImageInfo\"\xd5\x01\n\x14TextWatermarkRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x0c\n\x04text\x18\x03 \x01(\t\x12\x10\n\x08position\x18\x04 \x01(\t\x12\x11\n\tfont_size\x18\x05 \x01(\x05\x12\r\n\x05\x63olor\x18\x06 \x01(\t\x12\x0f\n\x07opacity\x18\x07 \x01(\x02\x12\x30\n\x08raw_info\x18\x08 \x01(\x0b\x32\x1e.image_processing.RawImageInfo\x12\x12\n\nraw_output\x18\t \x01(\x08\"\x81\x01\n\x14LogoWatermarkRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x11\n\tlogo_data\x18\x03 \x01(\x0c\x12\x10\n\x08position\x18\x04 \x01(\t\x12\r\n\x05scale\x18\x05 \x01(\x02\x12\x0f\n\x07opacity\x18\x06 \x01(\x02\"\x9e\x01\n\x11WatermarkResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x19\n\x11watermarked_image\x18\x03 \x01(\x0c\x12\x1a\n\x12processing_time_ms\x18\x04 \x01(\x05\x12\x30\n\x08raw_info\x18\x05 \x01(\x0b\x32\x1e.image_processing.RawImageInfo\"\xa7\x01\n\rFormatRequest\x12\x10\n\x08image_id\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12-\n\x06\x66ormat\x18\x03 \x01(\x0e\x32\x1d.image_processing.ImageFormat\x12\x0f\n\x07quality\x18\x04 \x01(\x05\x12\x30\n\x08raw_info\x18\x05 \x01(\x0b\x32\x1e.image_processing.RawImageInfo\"g\n\x0e\x46ormatResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x17\n\x0f\x66ormatted_image\x18\x03 \x01(\x0c\x12\x1a\n\x12processing_time_ms\x18\x04 \x01(\x05\"\x9e\x01\n\x0eProcessRequest\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x12\n\nimage_data\x18\x02 \x01(\x0c\x12\x34\n\x07options\x18\x03 \x01(\x0b\x32#.image_processing.ProcessingOptions\x12\x30\n\x08raw_info\x18\x04 \x01(\x0b\x32\x1e.image_processing.RawImageInfo\"\x88\x02\n\x11ProcessingOptions\x12\x14\n\x0ctarget_width\x18\x01 \x01(\x05\x12\x15\n\rtarget_height\x18\x02 \x01(\x05\x12-\n\x07\x66ilters\x18\x03 \x03(\x0e\x32\x1c.image_processing.FilterType\x12\x15\n\radd_watermark\x18\x04 \x01(\x08\x12\x16\n\x0ewatermark_text\x18\x05 \x01(\t\x12\x1a\n\x12watermark_position\x18\x06 \x01(\t\x12\x34\n\routput_format\x18\x07 \x01(\x0e\x32\x1d.image_processing.ImageFormat\x12\x16\n\x0eoutput_quality\x18\x08 \x01(\x05\"\x92\x01\n\x0fProcessResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x12\n\nprocess_id\x18\x03 \x01(\t\x12\x17\n\x0fprocessed_image\x18\x04 \x01(\x0c\x12\x30\n\x05stats\x18\x05 \x01(\x0b\x32!.image_processing.ProcessingStats\"f\n\x14ProcessResponseChunk\x12\x0e\n\x04\x64\x61ta\x18\x01 \x01(\x0cH\x00\x12\x33\n\x06result\x18\x02 \x01(\x0b\x32!.image_processing.ProcessResponseH\x00\x42\t\n\x07payload\"\xb8\x02\n\x0fProcessingStats\x12\x16\n\x0eresize_time_ms\x18\x01 \x01(\x05\x12\x16\n\x0e\x66ilter_time_ms\x18\x02 \x01(\x05\x12\x19\n\x11watermark_time_ms\x18\x03 \x01(\x05\x12\x16\n\x0e\x66ormat_time_ms\x18\x04 \x01(\x05\x12\x15\n\rtotal_time_ms\x18\x05 \x01(\x05\x12\x1b\n\x13original_size_bytes\x18\x06 \x01(\x03\x12\x1c\n\x14processed_size_bytes\x18\x07 \x01(\x03\x12@\n\x08host_map\x18\x08 \x03(\x0b\x32..image_processing.ProcessingStats.HostMapEntry\x1a.\n\x0cHostMapEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"#\n\rStatusRequest\x12\x12\n\nprocess_id\x18\x01 \x01(\t\"\x97\x01\n\x0eStatusResponse\x12\x12\n\nprocess_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x18\n\x10progress_percent\x18\x03 \x01(\x05\x12\x15\n\rcurrent_stage\x18\x04 \x01(\t\x12\x30\n\x05stats\x18\x05 \x01(\x0b\x32!.image_processing.ProcessingStats*\x84\x01\n\nFilterType\x12\x08\n\x04NONE\x10\x00\x12\r\n\tGRAYSCALE\x10\x01\x12\x08\n\x04\x42LUR\x10\x02\x12\x0b\n\x07SHARPEN\x10\x03\x12\x0f\n\x0b\x45\x44GE_DETECT\x10\x04\x12\t\n\x05SEPIA\x10\x05\x12\x0c\n\x08NEGATIVE\x10\x06\x12\x0e\n\nBRIGHTNESS\x10\x07\x12\x0c\n\x08\x43ONTRAST\x10\x08**\n\x0bImageFormat\x12\x07\n\x03PNG\x10\x00\x12\x08\n\x04JPEG\x10\x01\x12\x08\n\x04WEBP\x10\x02\x32\xba\x01\n\x0fReceiverService\x12O\n\x0bUploadImage\x12\x1c.image_processing.ImageChunk\x1a .image_processing.UploadResponse(\x01\x12V\n\rValidateImage\x12\x1f.image_processing.ImageMetadata\x1a$.image_processing.ValidationResponse2\xb2\x01\n\rResizeService\x12P\n\x0bResizeImage\x12\x1f.image_processing.ResizeRequest\x1a .image_processing.ResizeResponse\x12O\n\x0cGetThumbnail\x12\".image_processing.ThumbnailRequest\x1a\x1b.image_processing.ImageData2\xbd\x01\n\rFilterService\x12P\n\x0b\x41pplyFilter\x12\x1f.image_processing.FilterRequest\x1a .image_processing.FilterResponse\x12Z\n\x0b\x42\x61tchFilter\x12$.image_processing.BatchFilterRequest\x1a%.image_processing.BatchFilterResponse2\xd4\x01\n\x10WatermarkService\x12_\n\x10\x41\x64\x64TextWatermark\x12&.image_processing.TextWatermarkRequest\x1a#.image_processing.WatermarkResponse\x12_\n\x10\x41\x64\x64LogoWatermark\x12&.image_processing.LogoWatermarkRequest\x1a#.image_processing.WatermarkResponse2c\n\rFormatService\x12R\n\rConvertFormat\x12\x1f.image_processing.FormatRequest\x1a .image_processing.FormatResponse2\x80\x03\n\x13OrchestratorService\x12S\n\x0cProcessImage\x12 .image_processing.ProcessRequest\x1a!.image_processing.ProcessResponse\x12X\n\rProcessImages\x12 .image_processing.ProcessRequest\x1a!.image_processing.ProcessResponse(\x01\x30\x01\x12`\n\x12ProcessImageStream\x12 .image_processing.ProcessRequest\x1a&.image_processing.ProcessResponseChunk0\x01\x12X\n\x13GetProcessingStatus\x12\x1f.image_processing.StatusRequest\x1a .image_processing.StatusResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -23,68 +23,72 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._options = None
   _globals['_PROCESSINGSTATS_HOSTMAPENTRY']._options = None
   _globals['_PROCESSINGSTATS_HOSTMAPENTRY']._serialized_options = b'8\001'
-  _globals['_FILTERTYPE']._serialized_start=2995
-  _globals['_FILTERTYPE']._serialized_end=3127
-  _globals['_IMAGEFORMAT']._serialized_start=3129
-  _globals['_IMAGEFORMAT']._serialized_end=3171
-  _globals['_IMAGECHUNK']._serialized_start=44
-  _globals['_IMAGECHUNK']._serialized_end=165
-  _globals['_IMAGEMETADATA']._serialized_start=167
-  _globals['_IMAGEMETADATA']._serialized_end=285
-  _globals['_UPLOADRESPONSE']._serialized_start=287
-  _globals['_UPLOADRESPONSE']._serialized_end=406
-  _globals['_VALIDATIONRESPONSE']._serialized_start=408
-  _globals['_VALIDATIONRESPONSE']._serialized_end=476
-  _globals['_RESIZEREQUEST']._serialized_start=479
-  _globals['_RESIZEREQUEST']._serialized_end=608
-  _globals['_RESIZERESPONSE']._serialized_start=611
-  _globals['_RESIZERESPONSE']._serialized_end=751
-  _globals['_THUMBNAILREQUEST']._serialized_start=753
-  _globals['_THUMBNAILREQUEST']._serialized_end=823
-  _globals['_IMAGEDATA']._serialized_start=825
-  _globals['_IMAGEDATA']._serialized_end=897
-  _globals['_FILTERREQUEST']._serialized_start=899
-  _globals['_FILTERREQUEST']._serialized_end=1022
-  _globals['_FILTERRESPONSE']._serialized_start=1024
-  _globals['_FILTERRESPONSE']._serialized_end=1126
-  _globals['_BATCHFILTERREQUEST']._serialized_start=1128
-  _globals['_BATCHFILTERREQUEST']._serialized_end=1233
-  _globals['_BATCHFILTERRESPONSE']._serialized_start=1235
-  _globals['_BATCHFILTERRESPONSE']._serialized_end=1348
-  _globals['_TEXTWATERMARKREQUEST']._serialized_start=1351
-  _globals['_TEXTWATERMARKREQUEST']._serialized_end=1494
-  _globals['_LOGOWATERMARKREQUEST']._serialized_start=1497
-  _globals['_LOGOWATERMARKREQUEST']._serialized_end=1626
-  _globals['_WATERMARKRESPONSE']._serialized_start=1628
-  _globals['_WATERMARKRESPONSE']._serialized_end=1736
-  _globals['_FORMATREQUEST']._serialized_start=1738
-  _globals['_FORMATREQUEST']._serialized_end=1855
-  _globals['_FORMATRESPONSE']._serialized_start=1857
-  _globals['_FORMATRESPONSE']._serialized_end=1960
-  _globals['_PROCESSREQUEST']._serialized_start=1962
-  _globals['_PROCESSREQUEST']._serialized_end=2070
-  _globals['_PROCESSINGOPTIONS']._serialized_start=2073
-  _globals['_PROCESSINGOPTIONS']._serialized_end=2337
-  _globals['_PROCESSRESPONSE']._serialized_start=2340
-  _globals['_PROCESSRESPONSE']._serialized_end=2486
-  _globals['_PROCESSINGSTATS']._serialized_start=2489
-  _globals['_PROCESSINGSTATS']._serialized_end=2801
-  _globals['_PROCESSINGSTATS_HOSTMAPENTRY']._serialized_start=2755
-  _globals['_PROCESSINGSTATS_HOSTMAPENTRY']._serialized_end=2801
-  _globals['_STATUSREQUEST']._serialized_start=2803
-  _globals['_STATUSREQUEST']._serialized_end=2838
-  _globals['_STATUSRESPONSE']._serialized_start=2841
-  _globals['_STATUSRESPONSE']._serialized_end=2992
-  _globals['_RECEIVERSERVICE']._serialized_start=3174
-  _globals['_RECEIVERSERVICE']._serialized_end=3360
-  _globals['_RESIZESERVICE']._serialized_start=3363
-  _globals['_RESIZESERVICE']._serialized_end=3541
-  _globals['_FILTERSERVICE']._serialized_start=3544
-  _globals['_FILTERSERVICE']._serialized_end=3733
-  _globals['_WATERMARKSERVICE']._serialized_start=3736
-  _globals['_WATERMARKSERVICE']._serialized_end=3948
-  _globals['_FORMATSERVICE']._serialized_start=3950
-  _globals['_FORMATSERVICE']._serialized_end=4049
-  _globals['_ORCHESTRATORSERVICE']._serialized_start=4052
-  _globals['_ORCHESTRATORSERVICE']._serialized_end=4248
+  _globals['_FILTERTYPE']._serialized_start=3767
+  _globals['_FILTERTYPE']._serialized_end=3899
+  _globals['_IMAGEFORMAT']._serialized_start=3901
+  _globals['_IMAGEFORMAT']._serialized_end=3943
+  _globals['_RAWIMAGEINFO']._serialized_start=44
+  _globals['_RAWIMAGEINFO']._serialized_end=103
+  _globals['_IMAGECHUNK']._serialized_start=105
+  _globals['_IMAGECHUNK']._serialized_end=226
+  _globals['_IMAGEMETADATA']._serialized_start=228
+  _globals['_IMAGEMETADATA']._serialized_end=346
+  _globals['_UPLOADRESPONSE']._serialized_start=348
+  _globals['_UPLOADRESPONSE']._serialized_end=467
+  _globals['_VALIDATIONRESPONSE']._serialized_start=469
+  _globals['_VALIDATIONRESPONSE']._serialized_end=537
+  _globals['_RESIZEREQUEST']._serialized_start=540
+  _globals['_RESIZEREQUEST']._serialized_end=759
+  _globals['_RESIZERESPONSE']._serialized_start=762
+  _globals['_RESIZERESPONSE']._serialized_end=952
+  _globals['_THUMBNAILREQUEST']._serialized_start=954
+  _globals['_THUMBNAILREQUEST']._serialized_end=1024
+  _globals['_IMAGEDATA']._serialized_start=1026
+  _globals['_IMAGEDATA']._serialized_end=1098
+  _globals['_FILTERREQUEST']._serialized_start=1101
+  _globals['_FILTERREQUEST']._serialized_end=1294
+  _globals['_FILTERRESPONSE']._serialized_start=1297
+  _globals['_FILTERRESPONSE']._serialized_end=1449
+  _globals['_BATCHFILTERREQUEST']._serialized_start=1452
+  _globals['_BATCHFILTERREQUEST']._serialized_end=1627
+  _globals['_BATCHFILTERRESPONSE']._serialized_start=1630
+  _globals['_BATCHFILTERRESPONSE']._serialized_end=1793
+  _globals['_TEXTWATERMARKREQUEST']._serialized_start=1796
+  _globals['_TEXTWATERMARKREQUEST']._serialized_end=2009
+  _globals['_LOGOWATERMARKREQUEST']._serialized_start=2012
+  _globals['_LOGOWATERMARKREQUEST']._serialized_end=2141
+  _globals['_WATERMARKRESPONSE']._serialized_start=2144
+  _globals['_WATERMARKRESPONSE']._serialized_end=2302
+  _globals['_FORMATREQUEST']._serialized_start=2305
+  _globals['_FORMATREQUEST']._serialized_end=2472
+  _globals['_FORMATRESPONSE']._serialized_start=2474
+  _globals['_FORMATRESPONSE']._serialized_end=2577
+  _globals['_PROCESSREQUEST']._serialized_start=2580
+  _globals['_PROCESSREQUEST']._serialized_end=2738
+  _globals['_PROCESSINGOPTIONS']._serialized_start=2741
+  _globals['_PROCESSINGOPTIONS']._serialized_end=3005
+  _globals['_PROCESSRESPONSE']._serialized_start=3008
+  _globals['_PROCESSRESPONSE']._serialized_end=3154
+  _globals['_PROCESSRESPONSECHUNK']._serialized_start=3156
+  _globals['_PROCESSRESPONSECHUNK']._serialized_end=3258
+  _globals['_PROCESSINGSTATS']._serialized_start=3261
+  _globals['_PROCESSINGSTATS']._serialized_end=3573
+  _globals['_PROCESSINGSTATS_HOSTMAPENTRY']._serialized_start=3527
+  _globals['_PROCESSINGSTATS_HOSTMAPENTRY']._serialized_end=3573
+  _globals['_STATUSREQUEST']._serialized_start=3575
+  _globals['_STATUSREQUEST']._serialized_end=3610
+  _globals['_STATUSRESPONSE']._serialized_start=3613
+  _globals['_STATUSRESPONSE']._serialized_end=3764
+  _globals['_RECEIVERSERVICE']._serialized_start=3946
+  _globals['_RECEIVERSERVICE']._serialized_end=4132
+  _globals['_RESIZESERVICE']._serialized_start=4135
+  _globals['_RESIZESERVICE']._serialized_end=4313
+  _globals['_FILTERSERVICE']._serialized_start=4316
+  _globals['_FILTERSERVICE']._serialized_end=4505
+  _globals['_WATERMARKSERVICE']._serialized_start=4508
+  _globals['_WATERMARKSERVICE']._serialized_end=4720
+  _globals['_FORMATSERVICE']._serialized_start=4722
+  _globals['_FORMATSERVICE']._serialized_end=4821
+  _globals['_ORCHESTRATORSERVICE']._serialized_start=4824
+  _globals['_ORCHESTRATORSERVICE']._serialized_end=5208
 # @@protoc_insertion_point(module_scope)
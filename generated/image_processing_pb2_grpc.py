@@ -536,6 +536,16 @@ class OrchestratorServiceStub(object):
                 request_serializer=image__processing__pb2.ProcessRequest.SerializeToString,
                 response_deserializer=image__processing__pb2.ProcessResponse.FromString,
                 )
+        self.ProcessImages = channel.stream_stream(
+                '/image_processing.OrchestratorService/ProcessImages',
+                request_serializer=image__processing__pb2.ProcessRequest.SerializeToString,
+                response_deserializer=image__processing__pb2.ProcessResponse.FromString,
+                )
+        self.ProcessImageStream = channel.unary_stream(
+                '/image_processing.OrchestratorService/ProcessImageStream',
+                request_serializer=image__processing__pb2.ProcessRequest.SerializeToString,
+                response_deserializer=image__processing__pb2.ProcessResponseChunk.FromString,
+                )
         self.GetProcessingStatus = channel.unary_unary(
                 '/image_processing.OrchestratorService/GetProcessingStatus',
                 request_serializer=image__processing__pb2.StatusRequest.SerializeToString,
@@ -557,6 +567,20 @@ class OrchestratorServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ProcessImages(self, request_iterator, context):
+        """Batch variant: one response per request, in request order
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ProcessImageStream(self, request, context):
+        """Chunked variant: the image arrives as data chunks, then the result
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def GetProcessingStatus(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -571,6 +595,16 @@ def add_OrchestratorServiceServicer_to_server(servicer, server):
                     request_deserializer=image__processing__pb2.ProcessRequest.FromString,
                     response_serializer=image__processing__pb2.ProcessResponse.SerializeToString,
             ),
+            'ProcessImages': grpc.stream_stream_rpc_method_handler(
+                    servicer.ProcessImages,
+                    request_deserializer=image__processing__pb2.ProcessRequest.FromString,
+                    response_serializer=image__processing__pb2.ProcessResponse.SerializeToString,
+            ),
+            'ProcessImageStream': grpc.unary_stream_rpc_method_handler(
+                    servicer.ProcessImageStream,
+                    request_deserializer=image__processing__pb2.ProcessRequest.FromString,
+                    response_serializer=image__processing__pb2.ProcessResponseChunk.SerializeToString,
+            ),
             'GetProcessingStatus': grpc.unary_unary_rpc_method_handler(
                     servicer.GetProcessingStatus,
                     request_deserializer=image__processing__pb2.StatusRequest.FromString,
@@ -608,6 +642,40 @@ class OrchestratorService(object):
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
 
+    @staticmethod
+    def ProcessImages(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/image_processing.OrchestratorService/ProcessImages',
+            image__processing__pb2.ProcessRequest.SerializeToString,
+            image__processing__pb2.ProcessResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ProcessImageStream(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/image_processing.OrchestratorService/ProcessImageStream',
+            image__processing__pb2.ProcessRequest.SerializeToString,
+            image__processing__pb2.ProcessResponseChunk.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
     @staticmethod
     def GetProcessingStatus(request,
             target,
@@ -0,0 +1,133 @@
+"""
+Common helpers shared by the pipeline services
+"""
+import asyncio
+import atexit
+import hashlib
+import logging
+import logging.handlers
+import queue
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from PIL import Image
+
+import image_processing_pb2
+
+# Raw 2560x1440 RGB frames are ~11 MB, well past gRPC's 4 MB receive default
+MAX_MESSAGE_LENGTH = 64 * 1024 * 1024
+
+GRPC_OPTIONS = [
+    ('grpc.max_send_message_length', MAX_MESSAGE_LENGTH),
+    ('grpc.max_receive_message_length', MAX_MESSAGE_LENGTH),
+    # Accept the clients' 10s keepalive pings instead of answering GOAWAY
+    ('grpc.http2.min_ping_interval_without_data_ms', 5000),
+]
+
+# Calls an asyncio service works on at once, like the thread-pool servers'
+# 10 workers: each holds a decoded image, so this bounds memory. Further calls
+# wait for a slot instead of being rejected
+MAX_CONCURRENT_RPCS = int(os.getenv('MAX_CONCURRENT_RPCS', 10))
+
+# Per-request detail is logged at DEBUG; set LOG_LEVEL=DEBUG to see it
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+# Memory each stage service may spend on remembered results (0 disables the cache)
+STAGE_CACHE_MB = int(os.getenv('STAGE_CACHE_MB', 128))
+
+# zlib level for PNGs passed between stages (the Format service writes the final file)
+INTERMEDIATE_PNG_LEVEL = int(os.getenv('INTERMEDIATE_PNG_LEVEL', 1))
+
+
+def configure_logging():
+    """Send service logs to stderr at LOG_LEVEL.
+
+    Handlers only enqueue records; a listener thread does the console I/O, so
+    request threads never wait on the stream lock or a slow terminal.
+    """
+    records = queue.SimpleQueue()
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter('%(message)s'))
+    listener = logging.handlers.QueueListener(records, console)
+    listener.start()
+    atexit.register(listener.stop)
+    logging.basicConfig(level=LOG_LEVEL, format='%(message)s',
+                        handlers=[logging.handlers.QueueHandler(records)])
+
+
+def load_image(image_data, raw_info=None):
+    """Load request bytes: raw pixels if raw_info is set, else an encoded file"""
+    if raw_info is not None and raw_info.width > 0:
+        # frombuffer maps L/RGBA data in place instead of copying it (RGB is
+        # still copied into Pillow's 4-byte layout); the image is read-only
+        # and Pillow copies it first if anything writes to it
+        return Image.frombuffer(raw_info.mode, (raw_info.width, raw_info.height), image_data,
+                                'raw', raw_info.mode, 0, 1)
+    return Image.open(BytesIO(image_data))
+
+
+def dump_image(image, raw_output=False, format='PNG', **params):
+    """Serialize a stage result; returns (image_data, raw_info or None)"""
+    if raw_output:
+        raw_info = image_processing_pb2.RawImageInfo(width=image.width, height=image.height, mode=image.mode)
+        return image.tobytes(), raw_info
+    if format == 'PNG':
+        # Only the next stage decodes this file, so favour encode speed over size
+        params.setdefault('compress_level', INTERMEDIATE_PNG_LEVEL)
+    output_buffer = BytesIO()
+    image.save(output_buffer, format=format, **params)
+    # getvalue() hands over the buffer's own bytes object (no copy), unlike
+    # getbuffer().tobytes() or read()
+    return output_buffer.getvalue(), None
+
+
+class ResultCache:
+    """Byte-capped LRU of stage responses, keyed by input content and parameters"""
+
+    def __init__(self, max_bytes=STAGE_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, image_data, *params):
+        """Digest of the input image plus the parameters that shape the output
+        (None when the cache is disabled, which get and put then ignore)"""
+        if not self.max_bytes:
+            return None
+        return hashlib.blake2b(image_data, digest_size=16).digest() + repr(params).encode()
+
+    async def key_async(self, image_data, *params):
+        """key() for asyncio services: hashing a multi-megabyte image would
+        stall the event loop, so it runs on a thread (hashlib drops the GIL)"""
+        if not self.max_bytes:
+            return None
+        return await asyncio.to_thread(self.key, image_data, *params)
+
+    def get(self, key):
+        """Copy of the response stored under key, or None"""
+        if key is None:
+            return None
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                return None
+            self._entries.move_to_end(key)
+        copy = type(response)()
+        copy.CopyFrom(response)
+        return copy
+
+    def put(self, key, response):
+        """Remember a successful response, evicting the least recently used ones"""
+        size = response.ByteSize()
+        if key is None or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = response
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.ByteSize()
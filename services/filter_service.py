@@ -3,12 +3,15 @@ Filter Service - Applies various image filters (VERY CPU intensive)
 Includes: Blur, Sharpen, Grayscale, Edge Detection, Sepia, etc.
 """
 import grpc
+import asyncio
+import logging
+import functools
 from concurrent import futures
+import multiprocessing
 import sys
 import os
 import time
-from io import BytesIO
-from PIL import Image, ImageFilter, ImageEnhance
+from PIL import Image, ImageFilter, ImageEnhance, ImageStat
 import numpy as np
 
 # Fix Windows console encoding
@@ -21,117 +24,213 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'generated'))
 
 import image_processing_pb2
 import image_processing_pb2_grpc
+from common import GRPC_OPTIONS, MAX_CONCURRENT_RPCS, ResultCache, configure_logging, load_image, dump_image
 
+logger = logging.getLogger('FilterService')
 
-class FilterServiceServicer(image_processing_pb2_grpc.FilterServiceServicer):
+# Worker processes for the CPU-bound filters
+FILTER_WORKERS = int(os.getenv('FILTER_WORKERS', os.cpu_count() or 1))
+
+# Sepia tone as an RGB -> RGB conversion matrix, one row per output channel.
+# Pillow rounds the result; the -0.5 offsets make it truncate like astype(uint8).
+SEPIA_MATRIX = (0.393, 0.769, 0.189, -0.5,
+                0.349, 0.686, 0.168, -0.5,
+                0.272, 0.534, 0.131, -0.5)
+
+# 255 - v for one band; repeated per band for Image.point
+INVERT_LUT = list(range(255, -1, -1))
+
+# Pointwise filters that reduce to an Image.point table
+TABLE_FILTERS = (image_processing_pb2.NEGATIVE,
+                 image_processing_pb2.BRIGHTNESS,
+                 image_processing_pb2.CONTRAST)
+
+
+@functools.lru_cache(maxsize=32)
+def blended_invert_lut(intensity):
+    """INVERT_LUT blended with the identity, computed like Image.blend (float32, truncated)"""
+    v = np.arange(256, dtype=np.float32)
+    blended = (v + np.float32(intensity) * ((255 - v) - v)).astype(np.int32)
+    return np.clip(blended, 0, 255).tolist()
+
+
+@functools.lru_cache(maxsize=64)
+def enhance_lut(base, factor):
+    """Table for ImageEnhance: blend a flat `base` image towards the input by `factor`"""
+    v = np.arange(256, dtype=np.float32)
+    base = np.float32(base)
+    blended = (base + np.float32(factor) * (v - base)).astype(np.int32)
+    return np.clip(blended, 0, 255).tolist()
+
+
+def color_band_table(image, lut):
+    """Use one table for every band except alpha, which ImageEnhance leaves alone"""
+    identity = list(range(256))
+    return [value for band in image.getbands()
+            for value in (identity if band == 'A' else lut)]
+
+
+def compose_tables(first, second):
+    """Single table with the effect of applying `first`, then `second`"""
+    return [second[(i & ~0xFF) + value] for i, value in enumerate(first)]
+
+
+def filter_table(image, filter_type, intensity):
+    """Per-band lookup table (256 entries per band) for one of the TABLE_FILTERS"""
+    if filter_type == image_processing_pb2.NEGATIVE:
+        # Invert colors (one table lookup per band, no NumPy copies); a partial
+        # intensity is folded into the table instead of blending a second image
+        lut = blended_invert_lut(intensity) if intensity < 1.0 else INVERT_LUT
+        return lut * len(image.getbands())
+
+    elif filter_type == image_processing_pb2.BRIGHTNESS:
+        # Adjust brightness (same result as ImageEnhance.Brightness, but one
+        # table lookup instead of building and blending a black image)
+        factor = 1.0 + (intensity - 0.5) * 2.0
+        return color_band_table(image, enhance_lut(0, factor))
+
+    elif filter_type == image_processing_pb2.CONTRAST:
+        # Adjust contrast around the mean gray level, as ImageEnhance.Contrast does
+        gray = image if image.mode == 'L' else image.convert('L')
+        mean = int(ImageStat.Stat(gray).mean[0] + 0.5)
+        factor = 1.0 + intensity * 2.0
+        return color_band_table(image, enhance_lut(mean, factor))
+
+
+def apply_filter_by_type(image, filter_type, intensity):
+    """Apply the specified filter to the image"""
+
+    if filter_type == image_processing_pb2.GRAYSCALE:
+        # Convert to grayscale (Image.blend never modifies its inputs, so reuse
+        # images that are already in the right mode instead of copying them)
+        gray = image if image.mode == 'L' else image.convert('L')
+        if intensity < 1.0:
+            # Blend with original based on intensity
+            rgb = image if image.mode == 'RGB' else image.convert('RGB')
+            return Image.blend(rgb, gray.convert('RGB'), intensity)
+        # Stay single-band; run_filters converts back to RGB once at the end
+        return gray
+
+    elif filter_type == image_processing_pb2.BLUR:
+        # Apply Gaussian blur (CPU intensive)
+        radius = max(1, int(20 * intensity))
+        return image.filter(ImageFilter.GaussianBlur(radius))
+
+    elif filter_type == image_processing_pb2.SHARPEN:
+        # Apply sharpening
+        enhancer = ImageEnhance.Sharpness(image)
+        return enhancer.enhance(1.0 + intensity * 2.0)
+
+    elif filter_type == image_processing_pb2.EDGE_DETECT:
+        # Edge detection (very CPU intensive)
+        edges = image.filter(ImageFilter.FIND_EDGES)
+        if intensity < 1.0:
+            return Image.blend(image, edges, intensity)
+        return edges
+
+    elif filter_type == image_processing_pb2.SEPIA:
+        # Sepia tone effect (Pillow applies the matrix per pixel in C,
+        # without a float64 copy of the image)
+        result = image.convert('RGB').convert('RGB', SEPIA_MATRIX)
+        if intensity < 1.0:
+            return Image.blend(image, result, intensity)
+        return result
+
+    elif filter_type in TABLE_FILTERS:
+        return image.point(filter_table(image, filter_type, intensity))
+
+    else:
+        return image
+
+
+def run_filters(image_data, raw_info, filter_types, intensity, raw_output=False):
+    """Process pool worker: decode, apply the filters in order, encode as PNG (or raw)"""
+    image = load_image(image_data, raw_info)
+    input_mode = image.mode
     
-    def apply_filter_by_type(self, image, filter_type, intensity):
-        """Apply the specified filter to the image"""
-        
-        if filter_type == image_processing_pb2.GRAYSCALE:
-            # Convert to grayscale
-            gray = image.convert('L')
-            if intensity < 1.0:
-                # Blend with original based on intensity
-                return Image.blend(image.convert('RGB'), gray.convert('RGB'), intensity)
-            return gray.convert('RGB')
-        
-        elif filter_type == image_processing_pb2.BLUR:
-            # Apply Gaussian blur (CPU intensive)
-            radius = max(1, int(20 * intensity))
-            return image.filter(ImageFilter.GaussianBlur(radius))
-        
-        elif filter_type == image_processing_pb2.SHARPEN:
-            # Apply sharpening
-            enhancer = ImageEnhance.Sharpness(image)
-            return enhancer.enhance(1.0 + intensity * 2.0)
-        
-        elif filter_type == image_processing_pb2.EDGE_DETECT:
-            # Edge detection (very CPU intensive)
-            edges = image.filter(ImageFilter.FIND_EDGES)
-            if intensity < 1.0:
-                return Image.blend(image, edges, intensity)
-            return edges
-        
-        elif filter_type == image_processing_pb2.SEPIA:
-            # Sepia tone effect
-            img_array = np.array(image.convert('RGB'))
-            sepia_filter = np.array([[0.393, 0.769, 0.189],
-                                    [0.349, 0.686, 0.168],
-                                    [0.272, 0.534, 0.131]])
-            sepia_img = img_array.dot(sepia_filter.T)
-            sepia_img = np.clip(sepia_img, 0, 255).astype(np.uint8)
-            result = Image.fromarray(sepia_img)
-            if intensity < 1.0:
-                return Image.blend(image, result, intensity)
-            return result
-        
-        elif filter_type == image_processing_pb2.NEGATIVE:
-            # Invert colors
-            img_array = np.array(image)
-            inverted = 255 - img_array
-            result = Image.fromarray(inverted)
-            if intensity < 1.0:
-                return Image.blend(image, result, intensity)
-            return result
-        
-        elif filter_type == image_processing_pb2.BRIGHTNESS:
-            # Adjust brightness
-            enhancer = ImageEnhance.Brightness(image)
-            factor = 1.0 + (intensity - 0.5) * 2.0
-            return enhancer.enhance(factor)
-        
-        elif filter_type == image_processing_pb2.CONTRAST:
-            # Adjust contrast
-            enhancer = ImageEnhance.Contrast(image)
-            factor = 1.0 + intensity * 2.0
-            return enhancer.enhance(factor)
-        
+    # Consecutive table filters are folded into one table, so a chain like
+    # CONTRAST, BRIGHTNESS, NEGATIVE makes a single pass over the pixels.
+    # CONTRAST needs the mean of its actual input, so it starts a new table.
+    table = None
+    for filter_type in filter_types:
+        if table is not None and (filter_type not in TABLE_FILTERS
+                                  or filter_type == image_processing_pb2.CONTRAST):
+            image = image.point(table)
+            table = None
+        if filter_type in TABLE_FILTERS:
+            step = filter_table(image, filter_type, intensity)
+            table = step if table is None else compose_tables(table, step)
         else:
-            return image
+            image = apply_filter_by_type(image, filter_type, intensity)
+    if table is not None:
+        image = image.point(table)
+    
+    # Every filter works per band, so a grayscale chain ran on one band
+    # instead of three identical ones; widen it back only here (GRAYSCALE
+    # always returns RGB, even for grayscale input)
+    if image.mode == 'L' and (input_mode != 'L' or image_processing_pb2.GRAYSCALE in filter_types):
+        image = image.convert('RGB')
     
-    def ApplyFilter(self, request, context):
+    return dump_image(image, raw_output)
+
+
+class FilterServiceServicer(image_processing_pb2_grpc.FilterServiceServicer):
+    def __init__(self, pool):
+        # Filters run in worker processes so they are not serialized by the GIL
+        self.pool = pool
+        # Retries and repeated images skip the pool round trip entirely
+        self.cache = ResultCache()
+        # Calls past this many wait here rather than piling images on the pool
+        self.slots = asyncio.Semaphore(MAX_CONCURRENT_RPCS)
+    
+    async def ApplyFilter(self, request, context):
         """Apply a single filter to an image"""
         filter_name = image_processing_pb2.FilterType.Name(request.filter_type)
-        print(f"[FilterService] Applying {filter_name} (intensity={request.intensity:.2f}) to image_id={request.image_id}")
+        logger.info("[FilterService] Applying %s (intensity=%.2f) to image_id=%s",
+                    filter_name, request.intensity, request.image_id)
         
         start_time = time.time()
         
         try:
-            # Load image
-            image = Image.open(BytesIO(request.image_data))
+            # Read the bytes field once - each access makes a copy
+            image_data = request.image_data
+            cache_key = await self.cache.key_async(image_data, request.raw_info.SerializeToString(),
+                                                   request.filter_type, request.intensity, request.raw_output)
+            response = self.cache.get(cache_key)
+            if response is not None:
+                response.processing_time_ms = int((time.time() - start_time) * 1000)
+                logger.debug("  ♻️  Cached result reused for image_id=%s", request.image_id)
+                return response
             
-            # Apply filter
-            filtered_image = self.apply_filter_by_type(image, request.filter_type, request.intensity)
+            raw_info = request.raw_info if request.HasField('raw_info') else None
             
-            # Convert back to bytes
-            output_buffer = BytesIO()
-            filtered_image.save(output_buffer, format='PNG')
-            filtered_bytes = output_buffer.getvalue()
+            # Decode, filter and re-encode in a worker process; the event loop
+            # keeps receiving other requests meanwhile
+            async with self.slots:
+                filtered_bytes, raw_info = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, run_filters, image_data, raw_info, [request.filter_type], request.intensity,
+                    request.raw_output
+                )
             
             processing_time = int((time.time() - start_time) * 1000)
             
-            print(f"{'='*60}")
-            print(f"✅ FILTER COMPLETE")
-            print(f"{'='*60}")
-            print(f"   Filter Type:   {filter_name}")
-            print(f"   Intensity:     {request.intensity:.2f}")
-            print(f"   Image ID:      {request.image_id}")
-            print(f"   Input size:    {len(request.image_data):,} bytes")
-            print(f"   Output size:   {len(filtered_bytes):,} bytes")
-            print(f"   Processing:    {processing_time}ms")
-            print(f"{'='*60}\n")
+            logger.debug("✅ FILTER COMPLETE: %s intensity=%.2f image_id=%s, %d -> %d bytes in %dms",
+                         filter_name, request.intensity, request.image_id,
+                         len(image_data), len(filtered_bytes), processing_time)
             
-            return image_processing_pb2.FilterResponse(
+            response = image_processing_pb2.FilterResponse(
                 success=True,
                 message=f"Applied {filter_name} filter",
                 filtered_image=filtered_bytes,
-                processing_time_ms=processing_time
+                processing_time_ms=processing_time,
+                raw_info=raw_info
             )
+            self.cache.put(cache_key, response)
+            return response
             
         except Exception as e:
             processing_time = int((time.time() - start_time) * 1000)
-            print(f"  ❌ Error: {str(e)}")
+            logger.error("  ❌ Error: %s", e)
             return image_processing_pb2.FilterResponse(
                 success=False,
                 message=f"Filter failed: {str(e)}",
@@ -139,41 +238,48 @@ class FilterServiceServicer(image_processing_pb2_grpc.FilterServiceServicer):
                 processing_time_ms=processing_time
             )
     
-    def BatchFilter(self, request, context):
+    async def BatchFilter(self, request, context):
         """Apply multiple filters in sequence"""
         filter_names = [image_processing_pb2.FilterType.Name(f) for f in request.filters]
-        print(f"[FilterService] Batch processing {len(request.filters)} filters: {filter_names}")
+        logger.info("[FilterService] Batch processing %d filters: %s", len(request.filters), filter_names)
         
         start_time = time.time()
         
         try:
-            # Load image
-            image = Image.open(BytesIO(request.image_data))
+            image_data = request.image_data
+            cache_key = await self.cache.key_async(image_data, request.raw_info.SerializeToString(),
+                                                   tuple(request.filters), request.raw_output)
+            response = self.cache.get(cache_key)
+            if response is not None:
+                response.total_processing_time_ms = int((time.time() - start_time) * 1000)
+                logger.debug("  ♻️  Cached batch result reused")
+                return response
             
-            # Apply each filter sequentially
-            for i, filter_type in enumerate(request.filters):
-                filter_name = image_processing_pb2.FilterType.Name(filter_type)
-                print(f"  [{i+1}/{len(request.filters)}] Applying {filter_name}...")
-                image = self.apply_filter_by_type(image, filter_type, 0.8)
+            raw_info = request.raw_info if request.HasField('raw_info') else None
             
-            # Convert to bytes
-            output_buffer = BytesIO()
-            image.save(output_buffer, format='PNG')
-            filtered_bytes = output_buffer.getvalue()
+            # Apply each filter sequentially in a worker process
+            async with self.slots:
+                filtered_bytes, raw_info = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, run_filters, image_data, raw_info, list(request.filters), 0.8,
+                    request.raw_output
+                )
             
             processing_time = int((time.time() - start_time) * 1000)
-            print(f"  ✅ Batch completed in {processing_time}ms")
+            logger.debug("  ✅ Batch completed in %dms", processing_time)
             
-            return image_processing_pb2.BatchFilterResponse(
+            response = image_processing_pb2.BatchFilterResponse(
                 success=True,
                 message=f"Applied {len(request.filters)} filters",
                 filtered_image=filtered_bytes,
-                total_processing_time_ms=processing_time
+                total_processing_time_ms=processing_time,
+                raw_info=raw_info
             )
+            self.cache.put(cache_key, response)
+            return response
             
         except Exception as e:
             processing_time = int((time.time() - start_time) * 1000)
-            print(f"  ❌ Batch error: {str(e)}")
+            logger.error("  ❌ Batch error: %s", e)
             return image_processing_pb2.BatchFilterResponse(
                 success=False,
                 message=f"Batch filter failed: {str(e)}",
@@ -182,17 +288,22 @@ class FilterServiceServicer(image_processing_pb2_grpc.FilterServiceServicer):
             )
 
 
-def serve(port=50053):
+async def serve(port=50053):
     """Start the Filter Service server"""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Handlers are coroutines that await the pool; the filtering uses every core.
+    # Spawn the workers: forking a process that is running gRPC is unsafe.
+    pool = futures.ProcessPoolExecutor(max_workers=FILTER_WORKERS,
+                                       mp_context=multiprocessing.get_context('spawn'))
+    server = grpc.aio.server(options=GRPC_OPTIONS)
     image_processing_pb2_grpc.add_FilterServiceServicer_to_server(
-        FilterServiceServicer(), server
+        FilterServiceServicer(pool), server
     )
     server.add_insecure_port(f'[::]:{port}')
-    server.start()
-    print(f"🎨 Filter Service started on port {port}\n")
-    server.wait_for_termination()
+    await server.start()
+    logger.info("🎨 Filter Service started on port %d", port)
+    await server.wait_for_termination()
 
 
 if __name__ == '__main__':
-    serve()
+    configure_logging()
+    asyncio.run(serve())
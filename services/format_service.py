@@ -1,4 +1,5 @@
 import grpc
+import logging
 from concurrent import futures
 import time
 import os
@@ -11,15 +12,78 @@ sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'
 
 import image_processing_pb2
 import image_processing_pb2_grpc
+from common import GRPC_OPTIONS, INTERMEDIATE_PNG_LEVEL, ResultCache, configure_logging, load_image
+
+logger = logging.getLogger('FormatService')
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def zlib_flevel(level):
+    """FLEVEL a zlib stream compressed at level records in its header"""
+    if level < 0:
+        level = 6  # Z_DEFAULT_COMPRESSION
+    return 0 if level < 2 else 1 if level < 6 else 2 if level == 6 else 3
+
+
+# Intermediate PNGs carry this FLEVEL, so only PNGs marked higher can be final
+INTERMEDIATE_FLEVEL = zlib_flevel(INTERMEDIATE_PNG_LEVEL)
+
+
+def is_final_png(image_data):
+    """True for a PNG whose pixel data was deflated at zlib's default level or above.
+
+    Intermediate PNGs (INTERMEDIATE_PNG_LEVEL) are re-encoded so the output is
+    still optimized; anything compressed harder is returned as it is. With
+    INTERMEDIATE_PNG_LEVEL at 7 or more the two cannot be told apart, so every
+    PNG is re-encoded.
+    """
+    if not image_data.startswith(PNG_SIGNATURE):
+        return False
+    pos = len(PNG_SIGNATURE)
+    while pos + 10 <= len(image_data):
+        length = int.from_bytes(image_data[pos:pos + 4], 'big')
+        if image_data[pos + 4:pos + 8] == b'IDAT':
+            # FLEVEL, the top two bits of the zlib header's second byte: 2 = default, 3 = maximum
+            flevel = image_data[pos + 9] >> 6
+            return flevel >= 2 and flevel > INTERMEDIATE_FLEVEL
+        pos += length + 12
+    return False
+
 
 class FormatService(image_processing_pb2_grpc.FormatServiceServicer):
+    def __init__(self):
+        # Retries and repeated images skip the final encode
+        self.cache = ResultCache()
+    
     def ConvertFormat(self, request, context):
         start_time = time.time()
-        print(f"📦 Processing format request for image: {request.image_id}")
+        logger.info("📦 Processing format request for image: %s", request.image_id)
         
         try:
-            # Load image from bytes
-            image = Image.open(BytesIO(request.image_data))
+            # Load image from bytes (read the field once - each access makes a copy)
+            image_data = request.image_data
+            
+            # Already a well-compressed PNG and PNG requested: nothing to decode or encode
+            if request.format == image_processing_pb2.PNG and not request.raw_info.width and is_final_png(image_data):
+                processing_time = int((time.time() - start_time) * 1000)
+                logger.debug("   Input is already a compressed PNG, passing it through")
+                return image_processing_pb2.FormatResponse(
+                    success=True,
+                    message="Format conversion successful",
+                    formatted_image=image_data,
+                    processing_time_ms=processing_time
+                )
+            
+            cache_key = self.cache.key(image_data, request.raw_info.SerializeToString(),
+                                       request.format, request.quality)
+            response = self.cache.get(cache_key)
+            if response is not None:
+                response.processing_time_ms = int((time.time() - start_time) * 1000)
+                logger.debug("   Cached result reused")
+                return response
+            
+            image = load_image(image_data, request.raw_info)
             
             # Determine output format
             output_format = 'PNG' # Default
@@ -28,7 +92,7 @@ class FormatService(image_processing_pb2_grpc.FormatServiceServicer):
                 # JPEG doesn't support RGBA (transparency), convert to RGB
                 if image.mode in ('RGBA', 'LA'):
                     background = Image.new('RGB', image.size, (255, 255, 255))
-                    background.paste(image, mask=image.split()[-1])
+                    background.paste(image, mask=image.getchannel('A'))
                     image = background
             elif request.format == image_processing_pb2.WEBP:
                 output_format = 'WEBP'
@@ -41,7 +105,7 @@ class FormatService(image_processing_pb2_grpc.FormatServiceServicer):
             if quality <= 0 or quality > 100:
                 quality = 85  # Default quality
                 
-            print(f"   Converting to {output_format} with quality={quality}...")
+            logger.debug("   Converting to %s with quality=%d...", output_format, quality)
             
             if output_format == 'PNG':
                 # PNG is lossless, optimize=True helps size
@@ -53,27 +117,21 @@ class FormatService(image_processing_pb2_grpc.FormatServiceServicer):
             
             processing_time = int((time.time() - start_time) * 1000)
             
-            print(f"{'='*60}")
-            print(f"✅ FORMAT COMPLETE")
-            print(f"{'='*60}")
-            print(f"   Output Format: {output_format}")
-            print(f"   Quality:       {quality}%")
-            print(f"   Image ID:      {request.image_id}")
-            print(f"   Input size:    {len(request.image_data):,} bytes")
-            print(f"   Output size:   {len(formatted_data):,} bytes")
-            print(f"   Compression:   {((1 - len(formatted_data)/len(request.image_data)) * 100):.1f}%")
-            print(f"   Processing:    {processing_time}ms")
-            print(f"{'='*60}\n")
+            logger.debug("✅ FORMAT COMPLETE: %s quality=%d image_id=%s, %d -> %d bytes in %dms",
+                         output_format, quality, request.image_id,
+                         len(image_data), len(formatted_data), processing_time)
             
-            return image_processing_pb2.FormatResponse(
+            response = image_processing_pb2.FormatResponse(
                 success=True,
                 message="Format conversion successful",
                 formatted_image=formatted_data,
                 processing_time_ms=processing_time
             )
+            self.cache.put(cache_key, response)
+            return response
             
         except Exception as e:
-            print(f"❌ Error formatting image: {str(e)}")
+            logger.error("❌ Error formatting image: %s", e)
             return image_processing_pb2.FormatResponse(
                 success=False,
                 message=f"Format failed: {str(e)}",
@@ -82,7 +140,7 @@ class FormatService(image_processing_pb2_grpc.FormatServiceServicer):
             )
 
 def serve(port=50056):
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), options=GRPC_OPTIONS)
     image_processing_pb2_grpc.add_FormatServiceServicer_to_server(FormatService(), server)
     
     # Enable reflection (optional, for debugging)
@@ -97,11 +155,12 @@ def serve(port=50056):
         pass
 
     server.add_insecure_port(f'[::]:{port}')
-    print(f"📦 Format Service started on port {port}")
+    logger.info("📦 Format Service started on port %d", port)
     server.start()
     server.wait_for_termination()
 
 if __name__ == '__main__':
     # Allow port override via environment variable
     port = int(os.environ.get('PORT', 50056))
+    configure_logging()
     serve(port)
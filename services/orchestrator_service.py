@@ -6,7 +6,10 @@ NOW WITH LOAD BALANCING: Distributes requests across multiple service instances
 print("🚀 Orchestrator Service starting...", flush=True)
 
 import grpc
-from concurrent import futures
+import asyncio
+import logging
+from collections import deque
+import itertools
 import sys
 import os
 import uuid
@@ -22,6 +25,31 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'generated'))
 
 import image_processing_pb2
 import image_processing_pb2_grpc
+from common import GRPC_OPTIONS, MAX_CONCURRENT_RPCS, configure_logging
+
+logger = logging.getLogger('Orchestrator')
+
+# Images from one ProcessImages stream that run through the pipeline at once
+BATCH_WORKERS = 8
+
+# All workers on this machine: pass raw pixels between stages so only the
+# Format stage encodes, and skip compressing them on the wire
+LOCAL_FAST = os.environ.get('LOCAL_FAST') == '1'
+
+# Size of each data message sent by ProcessImageStream
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def hop_compression(raw_info):
+    """Gzip raw pixel payloads to remote workers; PNG/JPEG/WEBP bytes would not shrink"""
+    if raw_info is not None and not LOCAL_FAST:
+        return grpc.Compression.Gzip
+    return grpc.Compression.NoCompression
+
+
+def response_raw_info(response):
+    """RawImageInfo of a stage reply, or None if the stage sent an encoded file"""
+    return response.raw_info if response.HasField('raw_info') else None
 
 
 class OrchestratorServiceServicer(image_processing_pb2_grpc.OrchestratorServiceServicer):
@@ -32,46 +60,66 @@ class OrchestratorServiceServicer(image_processing_pb2_grpc.OrchestratorServiceS
         self.watermark_hosts = [h.strip() for h in watermark_hosts.split(',')]
         self.format_hosts = [h.strip() for h in format_hosts.split(',')]
         
-        # Round-robin counters
-        self.resize_idx = 0
-        self.filter_idx = 0
-        self.watermark_idx = 0
-        self.format_idx = 0
+        # One long-lived channel per worker; opening a channel per call costs a
+        # TCP + HTTP/2 handshake on every stage of every image
+        self.resize_stubs = {h: image_processing_pb2_grpc.ResizeServiceStub(self._channel(h)) for h in self.resize_hosts}
+        self.filter_stubs = {h: image_processing_pb2_grpc.FilterServiceStub(self._channel(h)) for h in self.filter_hosts}
+        self.watermark_stubs = {h: image_processing_pb2_grpc.WatermarkServiceStub(self._channel(h)) for h in self.watermark_hosts}
+        self.format_stubs = {h: image_processing_pb2_grpc.FormatServiceStub(self._channel(h)) for h in self.format_hosts}
+        
+        # Least-connections balancing: calls in flight per host, plus a rotating
+        # start index so ties still go round-robin. Every handler runs on the
+        # one event loop thread, so none of this needs a lock.
+        self._hosts = {
+            'resize': self.resize_hosts,
+            'filter': self.filter_hosts,
+            'watermark': self.watermark_hosts,
+            'format': self.format_hosts,
+        }
+        self._rotations = {service_type: itertools.count() for service_type in self._hosts}
+        self.inflight = {h: 0 for hosts in self._hosts.values() for h in hosts}
         
-        print(f"📊 Load Balancing Configuration:")
-        print(f"   Resize instances:    {len(self.resize_hosts)} - {self.resize_hosts}")
-        print(f"   Filter instances:    {len(self.filter_hosts)} - {self.filter_hosts}")
-        print(f"   Watermark instances: {len(self.watermark_hosts)} - {self.watermark_hosts}")
-        print(f"   Format instances:    {len(self.format_hosts)} - {self.format_hosts}")
+        # Pipelines past this many (across all clients and streams) wait for a
+        # slot instead of being rejected; each one holds its image in memory
+        self.slots = asyncio.Semaphore(MAX_CONCURRENT_RPCS)
+        
+        logger.info("📊 Load Balancing Configuration:")
+        logger.info("   Resize instances:    %d - %s", len(self.resize_hosts), self.resize_hosts)
+        logger.info("   Filter instances:    %d - %s", len(self.filter_hosts), self.filter_hosts)
+        logger.info("   Watermark instances: %d - %s", len(self.watermark_hosts), self.watermark_hosts)
+        logger.info("   Format instances:    %d - %s", len(self.format_hosts), self.format_hosts)
+
+    def _channel(self, host):
+        """Open a channel to a worker (connects lazily on first use)"""
+        return grpc.aio.insecure_channel(host, options=GRPC_OPTIONS)
 
     def _get_next_host(self, service_type):
-        """Get next host using round-robin"""
-        if service_type == 'resize':
-            host = self.resize_hosts[self.resize_idx]
-            self.resize_idx = (self.resize_idx + 1) % len(self.resize_hosts)
-            return host
-        elif service_type == 'filter':
-            host = self.filter_hosts[self.filter_idx]
-            self.filter_idx = (self.filter_idx + 1) % len(self.filter_hosts)
-            return host
-        elif service_type == 'watermark':
-            host = self.watermark_hosts[self.watermark_idx]
-            self.watermark_idx = (self.watermark_idx + 1) % len(self.watermark_hosts)
-            return host
-        elif service_type == 'format':
-            host = self.format_hosts[self.format_idx]
-            self.format_idx = (self.format_idx + 1) % len(self.format_hosts)
-            return host
-        return None
+        """Get the host with the fewest calls in flight; pair with _release_host"""
+        hosts = self._hosts.get(service_type)
+        if not hosts:
+            return None
+        start = next(self._rotations[service_type]) % len(hosts)
+        host = min(hosts[start:] + hosts[:start], key=self.inflight.__getitem__)
+        self.inflight[host] += 1
+        return host
+
+    def _release_host(self, host):
+        """Mark a call to a host from _get_next_host as finished"""
+        self.inflight[host] -= 1
 
-    def ProcessImage(self, request, context):
+    async def ProcessImage(self, request, context):
+        async with self.slots:
+            return await self._run_pipeline(request, context)
+    
+    async def _run_pipeline(self, request, context):
+        """Resize, filter, watermark and format one image"""
         process_id = str(uuid.uuid4())
-        print(f"\n" + "="*70)
-        print(f"[Orchestrator] Processing {request.filename} (process_id={process_id})")
-        print(f"="*70 + "\n")
+        logger.info("[Orchestrator] Processing %s (process_id=%s)", request.filename, process_id)
         
         start_total = time.time()
         current_image = request.image_data
+        # Set while current_image holds raw pixels rather than an encoded file
+        current_raw = request.raw_info if request.HasField('raw_info') else None
         
         stats = image_processing_pb2.ProcessingStats()
         stats.original_size_bytes = len(current_image)
@@ -79,119 +127,133 @@ class OrchestratorServiceServicer(image_processing_pb2_grpc.OrchestratorServiceS
         try:
             # --- STAGE 1: RESIZE ---
             if request.options.target_width > 0 or request.options.target_height > 0:
+                # Nothing may run between taking a host and the try that
+                # releases it, or a failure would leak its in-flight count
                 resize_host = self._get_next_host('resize')
-                print(f"🖼  STAGE 1: Resizing image... (using {resize_host})")
-                
-                with grpc.insecure_channel(resize_host) as channel:
-                    stub = image_processing_pb2_grpc.ResizeServiceStub(channel)
-                    response = stub.ResizeImage(image_processing_pb2.ResizeRequest(
+                try:
+                    logger.debug("🖼  STAGE 1: Resizing image... (using %s)", resize_host)
+                    response = await self.resize_stubs[resize_host].ResizeImage(image_processing_pb2.ResizeRequest(
                         image_id=process_id,
                         image_data=current_image,
                         target_width=request.options.target_width,
                         target_height=request.options.target_height,
-                        maintain_aspect_ratio=True
-                    ))
-                    
-                    if not response.success:
-                        raise Exception(f"Resize failed: {response.message}")
-                    
-                    current_image = response.resized_image
-                    stats.resize_time_ms = response.processing_time_ms
-                    stats.host_map["Resize"] = resize_host
-                    print(f"   ✅ Resized in {stats.resize_time_ms}ms")
+                        maintain_aspect_ratio=True,
+                        raw_info=current_raw,
+                        raw_output=LOCAL_FAST
+                    ), compression=hop_compression(current_raw))
+                finally:
+                    self._release_host(resize_host)
+                
+                if not response.success:
+                    raise Exception(f"Resize failed: {response.message}")
+                
+                current_image = response.resized_image
+                current_raw = response_raw_info(response)
+                stats.resize_time_ms = response.processing_time_ms
+                stats.host_map["Resize"] = resize_host
+                logger.debug("   ✅ Resized in %dms", stats.resize_time_ms)
             else:
-                print("⏭️  STAGE 1: Skipping resize")
+                logger.debug("⏭️  STAGE 1: Skipping resize")
 
             # --- STAGE 2: FILTERS ---
             if request.options.filters:
-                print(f"🎨 STAGE 2: Applying {len(request.options.filters)} filter(s)...")
+                logger.debug("🎨 STAGE 2: Applying %d filter(s)...", len(request.options.filters))
                 filter_start = time.time()
                 
                 for i, filter_type in enumerate(request.options.filters):
-                    filter_host = self._get_next_host('filter')
+                    # Raises ValueError for unknown enum values, so look the
+                    # name up before taking a host
                     filter_name = image_processing_pb2.FilterType.Name(filter_type)
-                    print(f"   [{i+1}/{len(request.options.filters)}] Applying {filter_name}... (using {filter_host})")
-                    
-                    with grpc.insecure_channel(filter_host) as channel:
-                        stub = image_processing_pb2_grpc.FilterServiceStub(channel)
-                        response = stub.ApplyFilter(image_processing_pb2.FilterRequest(
+                    filter_host = self._get_next_host('filter')
+                    try:
+                        logger.debug("   [%d/%d] Applying %s... (using %s)",
+                                     i + 1, len(request.options.filters), filter_name, filter_host)
+                        response = await self.filter_stubs[filter_host].ApplyFilter(image_processing_pb2.FilterRequest(
                             image_id=process_id,
                             image_data=current_image,
                             filter_type=filter_type,
-                            intensity=1.0
-                        ))
-                        
-                        if not response.success:
-                            raise Exception(f"Filter {filter_name} failed: {response.message}")
-                        
-                        current_image = response.filtered_image
-                        stats.host_map[f"Filter-{i+1} ({filter_name})"] = filter_host
+                            intensity=1.0,
+                            raw_info=current_raw,
+                            raw_output=LOCAL_FAST
+                        ), compression=hop_compression(current_raw))
+                    finally:
+                        self._release_host(filter_host)
+                    
+                    if not response.success:
+                        raise Exception(f"Filter {filter_name} failed: {response.message}")
+                    
+                    current_image = response.filtered_image
+                    current_raw = response_raw_info(response)
+                    stats.host_map[f"Filter-{i+1} ({filter_name})"] = filter_host
                 
                 stats.filter_time_ms = int((time.time() - filter_start) * 1000)
-                print(f"   ✅ Filters applied in {stats.filter_time_ms}ms")
+                logger.debug("   ✅ Filters applied in %dms", stats.filter_time_ms)
             else:
-                print("⏭️  STAGE 2: Skipping filters")
+                logger.debug("⏭️  STAGE 2: Skipping filters")
 
             # --- STAGE 3: WATERMARK ---
             if request.options.add_watermark:
                 watermark_host = self._get_next_host('watermark')
-                print(f"🏷️  STAGE 3: Adding watermark... (using {watermark_host})")
-                
-                with grpc.insecure_channel(watermark_host) as channel:
-                    stub = image_processing_pb2_grpc.WatermarkServiceStub(channel)
-                    response = stub.AddTextWatermark(image_processing_pb2.TextWatermarkRequest(
+                try:
+                    logger.debug("🏷️  STAGE 3: Adding watermark... (using %s)", watermark_host)
+                    response = await self.watermark_stubs[watermark_host].AddTextWatermark(image_processing_pb2.TextWatermarkRequest(
                         image_id=process_id,
                         image_data=current_image,
                         text=request.options.watermark_text,
                         position=request.options.watermark_position or 'bottom-right',
                         font_size=30,
                         color="#FFFFFF",
-                        opacity=0.8
-                    ))
-                    
-                    if not response.success:
-                        raise Exception(f"Watermark failed: {response.message}")
-                    
-                    current_image = response.watermarked_image
-                    stats.watermark_time_ms = response.processing_time_ms
-                    stats.host_map["Watermark"] = watermark_host
-                    print(f"   ✅ Watermark added in {stats.watermark_time_ms}ms")
+                        opacity=0.8,
+                        raw_info=current_raw,
+                        raw_output=LOCAL_FAST
+                    ), compression=hop_compression(current_raw))
+                finally:
+                    self._release_host(watermark_host)
+                
+                if not response.success:
+                    raise Exception(f"Watermark failed: {response.message}")
+                
+                current_image = response.watermarked_image
+                current_raw = response_raw_info(response)
+                stats.watermark_time_ms = response.processing_time_ms
+                stats.host_map["Watermark"] = watermark_host
+                logger.debug("   ✅ Watermark added in %dms", stats.watermark_time_ms)
             else:
-                print("⏭️  STAGE 3: Skipping watermark")
+                logger.debug("⏭️  STAGE 3: Skipping watermark")
 
             # --- STAGE 4: FORMAT/COMPRESSION ---
-            format_host = self._get_next_host('format')
-            print(f"📦 STAGE 4: Formatting/Compressing... (using {format_host})")
+            # Default to PNG if not specified
+            target_format = request.options.output_format
+            target_quality = request.options.output_quality
+            if target_quality == 0: target_quality = 90
             
-            with grpc.insecure_channel(format_host) as channel:
-                stub = image_processing_pb2_grpc.FormatServiceStub(channel)
-                
-                # Default to PNG if not specified
-                target_format = request.options.output_format
-                target_quality = request.options.output_quality
-                if target_quality == 0: target_quality = 90
-                
-                response = stub.ConvertFormat(image_processing_pb2.FormatRequest(
+            format_host = self._get_next_host('format')
+            try:
+                logger.debug("📦 STAGE 4: Formatting/Compressing... (using %s)", format_host)
+                response = await self.format_stubs[format_host].ConvertFormat(image_processing_pb2.FormatRequest(
                     image_id=process_id,
                     image_data=current_image,
                     format=target_format,
-                    quality=target_quality
-                ))
-                
-                if not response.success:
-                    raise Exception(f"Format failed: {response.message}")
-                
-                current_image = response.formatted_image
-                stats.format_time_ms = response.processing_time_ms
-                stats.host_map["Format"] = format_host
-                print(f"   ✅ Formatted in {stats.format_time_ms}ms")
+                    quality=target_quality,
+                    raw_info=current_raw
+                ), compression=hop_compression(current_raw))
+            finally:
+                self._release_host(format_host)
+            
+            if not response.success:
+                raise Exception(f"Format failed: {response.message}")
+            
+            current_image = response.formatted_image
+            stats.format_time_ms = response.processing_time_ms
+            stats.host_map["Format"] = format_host
+            logger.debug("   ✅ Formatted in %dms", stats.format_time_ms)
 
             # Finalize
             stats.total_time_ms = int((time.time() - start_total) * 1000)
             stats.processed_size_bytes = len(current_image)
             stats.host_map["Orchestrator"] = "Device 5 (Master)"
             
-            print(f"\n✅ Pipeline Complete! Total time: {stats.total_time_ms}ms")
+            logger.info("✅ Pipeline Complete! Total time: %dms", stats.total_time_ms)
             
             return image_processing_pb2.ProcessResponse(
                 success=True,
@@ -202,9 +264,40 @@ class OrchestratorServiceServicer(image_processing_pb2_grpc.OrchestratorServiceS
             )
 
         except Exception as e:
-            print(f"❌ Pipeline error: {str(e)}")
+            logger.error("❌ Pipeline error: %s", e)
             return self._error_response(process_id, str(e))
     
+    async def ProcessImages(self, request_iterator, context):
+        """Run a stream of images through the pipeline concurrently"""
+        pending = deque()
+        try:
+            async for request in request_iterator:
+                pending.append(asyncio.ensure_future(self.ProcessImage(request, context)))
+                
+                # Reply in request order as soon as the oldest image is done, and
+                # stop reading ahead once enough images are in flight
+                while pending and (pending[0].done() or len(pending) >= BATCH_WORKERS):
+                    yield await pending.popleft()
+            
+            while pending:
+                yield await pending.popleft()
+        finally:
+            # The client went away or the stream failed: nobody will read
+            # these results, so stop working on them
+            for task in pending:
+                task.cancel()
+    
+    async def ProcessImageStream(self, request, context):
+        """Run one image through the pipeline and send it back in chunks"""
+        response = await self.ProcessImage(request, context)
+        processed_image = response.processed_image
+        response.processed_image = b''
+        
+        for offset in range(0, len(processed_image), STREAM_CHUNK_SIZE):
+            yield image_processing_pb2.ProcessResponseChunk(
+                data=processed_image[offset:offset + STREAM_CHUNK_SIZE])
+        yield image_processing_pb2.ProcessResponseChunk(result=response)
+    
     def _error_response(self, process_id, message):
         """Helper to create error response"""
         return image_processing_pb2.ProcessResponse(
@@ -215,7 +308,7 @@ class OrchestratorServiceServicer(image_processing_pb2_grpc.OrchestratorServiceS
             stats=image_processing_pb2.ProcessingStats()
         )
     
-    def GetProcessingStatus(self, request, context):
+    async def GetProcessingStatus(self, request, context):
         """Get status of a processing job"""
         return image_processing_pb2.StatusResponse(
             process_id=request.process_id,
@@ -226,7 +319,7 @@ class OrchestratorServiceServicer(image_processing_pb2_grpc.OrchestratorServiceS
         )
 
 
-def serve(port=50055):
+async def serve(port=50055):
     """Start the Orchestrator Service server"""
     
     # ------------------------------------------------------------------
@@ -244,7 +337,9 @@ def serve(port=50055):
     watermark_hosts = os.getenv('WATERMARK_SERVICE_HOSTS', f'{DEFAULT_WATERMARK_IP}:50054')
     format_hosts = os.getenv('FORMAT_SERVICE_HOSTS', f'{DEFAULT_FORMAT_IP}:50056')
     
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Handlers are coroutines: an image waiting on a worker costs no thread,
+    # and the worker channels are opened on this event loop
+    server = grpc.aio.server(options=GRPC_OPTIONS)
     image_processing_pb2_grpc.add_OrchestratorServiceServicer_to_server(
         OrchestratorServiceServicer(resize_hosts, filter_hosts, watermark_hosts, format_hosts), server
     )
@@ -257,16 +352,17 @@ def serve(port=50055):
             reflection.SERVICE_NAME,
         )
         reflection.enable_server_reflection(SERVICE_NAMES, server)
-        print("   ✓ gRPC reflection enabled")
+        logger.info("   ✓ gRPC reflection enabled")
     except ImportError:
-        print("   ⚠ gRPC reflection not available (install grpcio-reflection for debugging support)")
+        logger.warning("   ⚠ gRPC reflection not available (install grpcio-reflection for debugging support)")
         pass
 
     server.add_insecure_port(f'[::]:{port}')
-    print(f"🎯 Orchestrator Service started on port {port}")
-    server.start()
-    server.wait_for_termination()
+    logger.info("🎯 Orchestrator Service started on port %d", port)
+    await server.start()
+    await server.wait_for_termination()
 
 
 if __name__ == '__main__':
-    serve()
+    configure_logging()
+    asyncio.run(serve())
@@ -3,7 +3,10 @@ Resize Service - Resizes images to specified dimensions
 Computationally intensive: Uses Pillow for image manipulation
 """
 import grpc
+import asyncio
+import logging
 from concurrent import futures
+import multiprocessing
 import sys
 import os
 import time
@@ -20,75 +23,179 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'generated'))
 
 import image_processing_pb2
 import image_processing_pb2_grpc
+from common import GRPC_OPTIONS, MAX_CONCURRENT_RPCS, INTERMEDIATE_PNG_LEVEL, ResultCache, configure_logging, load_image, dump_image
+
+logger = logging.getLogger('ResizeService')
+
+# Worker processes for decoding, resampling and encoding
+RESIZE_WORKERS = int(os.getenv('RESIZE_WORKERS', os.cpu_count() or 1))
+
+# Optional libvips backend for encoded images (set USE_VIPS=1; needs pyvips and
+# libvips): shrink-on-load decoding and streaming keep time and memory low
+USE_VIPS = os.getenv('USE_VIPS') == '1'
+if USE_VIPS:
+    try:
+        import pyvips
+    except ImportError:
+        logger.warning("⚠ USE_VIPS is set but pyvips is not installed - resizing with Pillow")
+        USE_VIPS = False
+
+VIPS_SUFFIXES = {'PNG': '.png', 'JPEG': '.jpg', 'WEBP': '.webp'}
+
+# Large downscales first shrink by a whole factor with Image.reduce (a box
+# filter), keeping the source at least this many times the target for LANCZOS.
+# 3.0 is within a few levels of a plain LANCZOS resize; 0 disables it
+RESIZE_REDUCING_GAP = float(os.getenv('RESIZE_REDUCING_GAP', '3.0')) or None
+
+
+def vips_resize(image_data, width, height, format):
+    """Decode, resize and re-encode an image file with libvips"""
+    thumb = pyvips.Image.thumbnail_buffer(image_data, width, height=height, size='force')
+    if format == 'PNG':
+        return thumb.write_to_buffer('.png', compression=INTERMEDIATE_PNG_LEVEL)
+    return thumb.write_to_buffer(VIPS_SUFFIXES[format])
+
+
+def warm_up():
+    """Pool initializer: import every codec plugin now, so a new worker's
+    first request does not pay for it"""
+    Image.init()
+
+
+def resize_image(image_data, raw_info, target_width, target_height, maintain_aspect_ratio, raw_output=False):
+    """Process pool worker: decode, resize and encode one image.
+
+    Returns (resized_bytes, raw_info, original_size, new_size); resized_bytes is
+    None when the input can be sent back unchanged.
+    """
+    image = load_image(image_data, raw_info)
+    original_size = image.size
+    
+    # Calculate new dimensions
+    if maintain_aspect_ratio:
+        # Calculate aspect ratio
+        aspect = original_size[0] / original_size[1]
+        if target_width > 0 and target_height > 0:
+            # Use the dimension that results in smaller image
+            new_width = target_width
+            new_height = int(new_width / aspect)
+            if new_height > target_height:
+                new_height = target_height
+                new_width = int(new_height * aspect)
+        elif target_width > 0:
+            new_width = target_width
+            new_height = int(new_width / aspect)
+        else:
+            new_height = target_height
+            new_width = int(new_height * aspect)
+    else:
+        new_width = target_width if target_width > 0 else original_size[0]
+        new_height = target_height if target_height > 0 else original_size[1]
+    
+    if (new_width, new_height) == original_size and (raw_info is None) != raw_output:
+        # Already the right size and in the requested layout: nothing to resample
+        # or re-encode (and a JPEG is not recompressed for nothing)
+        return None, raw_info, original_size, original_size
+    
+    if USE_VIPS and not raw_output and image.format in VIPS_SUFFIXES:
+        # libvips reads, resizes and writes the file in one streaming pass
+        resized_bytes, raw_info = vips_resize(image_data, new_width, new_height, image.format), None
+    else:
+        # Let libjpeg decode a large JPEG straight at 1/2, 1/4 or 1/8 scale
+        # (still at least twice the target) instead of at full size
+        if image.format == 'JPEG':
+            image.draft(image.mode, (new_width * 2, new_height * 2))
+        
+        # Resize the image (use LANCZOS for high quality)
+        resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS,
+                                     reducing_gap=RESIZE_REDUCING_GAP)
+        
+        # Convert back to bytes
+        resized_bytes, raw_info = dump_image(resized_image, raw_output, format=image.format or 'PNG')
+    
+    return resized_bytes, raw_info, original_size, (new_width, new_height)
+
+
+def make_thumbnail(image_data, size):
+    """Process pool worker: square-bounded PNG thumbnail; returns (data, width, height).
+
+    data is None when the input is a PNG that already fits and can be sent back as is.
+    """
+    image = Image.open(BytesIO(image_data))
+    
+    if image.format == 'PNG' and image.width <= size and image.height <= size:
+        # thumbnail() would not shrink it; skip the decode and re-encode
+        return None, image.width, image.height
+    
+    # Create square thumbnail
+    image.thumbnail((size, size), Image.Resampling.LANCZOS)
+    
+    # Convert to bytes
+    output_buffer = BytesIO()
+    image.save(output_buffer,format='PNG')
+    return output_buffer.getvalue(), image.width, image.height
 
 
 class ResizeServiceServicer(image_processing_pb2_grpc.ResizeServiceServicer):
-    def ResizeImage(self, request, context):
+    def __init__(self, pool):
+        # Decoding, LANCZOS and encoding run in worker processes so they are
+        # not serialized by the GIL
+        self.pool = pool
+        # Retries and repeated uploads skip Pillow entirely
+        self.cache = ResultCache()
+        # Calls past this many wait here rather than piling images on the pool
+        self.slots = asyncio.Semaphore(MAX_CONCURRENT_RPCS)
+    
+    async def ResizeImage(self, request, context):
         """Resize an image to target dimensions"""
-        print(f"[ResizeService] Processing image_id={request.image_id}, target={request.target_width}x{request.target_height}")
+        logger.info("[ResizeService] Processing image_id=%s, target=%dx%d",
+                    request.image_id, request.target_width, request.target_height)
         
         start_time = time.time()
         
         try:
-            # Load image from bytes
-            image = Image.open(BytesIO(request.image_data))
-            original_size = image.size
-            print(f"  Original size: {original_size[0]}x{original_size[1]}")
-            
-            # Calculate new dimensions
-            if request.maintain_aspect_ratio:
-                # Calculate aspect ratio
-                aspect = original_size[0] / original_size[1]
-                if request.target_width > 0 and request.target_height > 0:
-                    # Use the dimension that results in smaller image
-                    new_width = request.target_width
-                    new_height = int(new_width / aspect)
-                    if new_height > request.target_height:
-                        new_height = request.target_height
-                        new_width = int(new_height * aspect)
-                elif request.target_width > 0:
-                    new_width = request.target_width
-                    new_height = int(new_width / aspect)
-                else:
-                    new_height = request.target_height
-                    new_width = int(new_height * aspect)
-            else:
-                new_width = request.target_width if request.target_width > 0 else original_size[0]
-                new_height = request.target_height if request.target_height > 0 else original_size[1]
+            # Load image from bytes (read the field once - each access makes a copy)
+            image_data = request.image_data
+            cache_key = None if request.skip_cache else await self.cache.key_async(
+                image_data, request.raw_info.SerializeToString(), request.target_width,
+                request.target_height, request.maintain_aspect_ratio, request.raw_output)
+            response = self.cache.get(cache_key)
+            if response is not None:
+                response.processing_time_ms = int((time.time() - start_time) * 1000)
+                logger.debug("  ♻️  Cached result reused for image_id=%s", request.image_id)
+                return response
             
-            # Resize the image (use LANCZOS for high quality)
-            resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Convert back to bytes
-            output_buffer = BytesIO()
-            resized_image.save(output_buffer, format=image.format or 'PNG')
-            resized_bytes = output_buffer.getvalue()
+            raw_info = request.raw_info if request.HasField('raw_info') else None
+            async with self.slots:
+                resized_bytes, raw_info, original_size, (new_width, new_height) = \
+                    await asyncio.get_running_loop().run_in_executor(
+                        self.pool, resize_image, image_data, raw_info, request.target_width,
+                        request.target_height, request.maintain_aspect_ratio, request.raw_output
+                    )
+            if resized_bytes is None:
+                resized_bytes = image_data
             
             processing_time = int((time.time() - start_time) * 1000)
             
-            print(f"{'='*60}")
-            print(f"✅ RESIZE COMPLETE")
-            print(f"{'='*60}")
-            print(f"   Image ID:      {request.image_id}")
-            print(f"   Original:      {original_size[0]}x{original_size[1]}")
-            print(f"   Resized to:    {new_width}x{new_height}")
-            print(f"   Input size:    {len(request.image_data):,} bytes")
-            print(f"   Output size:   {len(resized_bytes):,} bytes")
-            print(f"   Processing:    {processing_time}ms")
-            print(f"{'='*60}\n")
+            logger.debug("✅ RESIZE COMPLETE: image_id=%s %dx%d -> %dx%d, %d -> %d bytes in %dms",
+                         request.image_id, original_size[0], original_size[1], new_width, new_height,
+                         len(image_data), len(resized_bytes), processing_time)
             
-            return image_processing_pb2.ResizeResponse(
+            response = image_processing_pb2.ResizeResponse(
                 success=True,
                 message=f"Resized from {original_size[0]}x{original_size[1]} to {new_width}x{new_height}",
                 resized_image=resized_bytes,
                 new_width=new_width,
                 new_height=new_height,
-                processing_time_ms=processing_time
+                processing_time_ms=processing_time,
+                raw_info=raw_info
             )
+            self.cache.put(cache_key, response)
+            return response
             
         except Exception as e:
             processing_time = int((time.time() - start_time) * 1000)
-            print(f"  ❌ Error: {str(e)}")
+            logger.error("  ❌ Error: %s", e)
             return image_processing_pb2.ResizeResponse(
                 success=False,
                 message=f"Resize failed: {str(e)}",
@@ -96,30 +203,28 @@ class ResizeServiceServicer(image_processing_pb2_grpc.ResizeServiceServicer):
                 processing_time_ms=processing_time
             )
     
-    def GetThumbnail(self, request, context):
+    async def GetThumbnail(self, request, context):
         """Generate a square thumbnail"""
-        print(f"[ResizeService] Creating thumbnail: size={request.size}")
+        logger.info("[ResizeService] Creating thumbnail: size=%d", request.size)
         
         try:
-            image = Image.open(BytesIO(request.image_data))
-            
-            # Create square thumbnail
-            image.thumbnail((request.size, request.size), Image.Resampling.LANCZOS)
-            
-            # Convert to bytes
-            output_buffer = BytesIO()
-            image.save(output_buffer,format='PNG')
-            thumb_bytes = output_buffer.getvalue()
+            image_data = request.image_data
+            async with self.slots:
+                thumb_bytes, width, height = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, make_thumbnail, image_data, request.size
+                )
+            if thumb_bytes is None:
+                thumb_bytes = image_data
             
             return image_processing_pb2.ImageData(
                 data=thumb_bytes,
-                width=image.width,
-                height=image.height,
+                width=width,
+                height=height,
                 format='PNG'
             )
             
         except Exception as e:
-            print(f"  ❌ Thumbnail error: {str(e)}")
+            logger.error("  ❌ Thumbnail error: %s", e)
             return image_processing_pb2.ImageData(
                 data=b'',
                 width=0,
@@ -128,17 +233,26 @@ class ResizeServiceServicer(image_processing_pb2_grpc.ResizeServiceServicer):
             )
 
 
-def serve(port=50052):
+async def serve(port=50052):
     """Start the Resize Service server"""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Handlers are coroutines that await the pool; resizing uses every core.
+    # Spawn the workers: forking a process that is running gRPC is unsafe.
+    pool = futures.ProcessPoolExecutor(max_workers=RESIZE_WORKERS,
+                                       mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=warm_up)
+    # Spawned pools start workers on demand; start them all before serving
+    for _ in range(RESIZE_WORKERS):
+        pool.submit(os.getpid)
+    server = grpc.aio.server(options=GRPC_OPTIONS)
     image_processing_pb2_grpc.add_ResizeServiceServicer_to_server(
-        ResizeServiceServicer(), server
+        ResizeServiceServicer(pool), server
     )
     server.add_insecure_port(f'[::]:{port}')
-    server.start()
-    print(f"🖼️  Resize Service started on port {port}\n")
-    server.wait_for_termination()
+    await server.start()
+    logger.info("🖼️  Resize Service started on port %d", port)
+    await server.wait_for_termination()
 
 
 if __name__ == '__main__':
-    serve()
+    configure_logging()
+    asyncio.run(serve())
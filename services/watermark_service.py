@@ -2,7 +2,11 @@
 Watermark Service - Adds text or logo watermarks to images
 """
 import grpc
+import asyncio
+import logging
+import functools
 from concurrent import futures
+import multiprocessing
 import sys
 import os
 import time
@@ -19,94 +23,178 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'generated'))
 
 import image_processing_pb2
 import image_processing_pb2_grpc
+from common import GRPC_OPTIONS, MAX_CONCURRENT_RPCS, ResultCache, configure_logging, load_image, dump_image
+
+logger = logging.getLogger('WatermarkService')
+
+# Worker processes for decoding, drawing and encoding
+WATERMARK_WORKERS = int(os.getenv('WATERMARK_WORKERS', os.cpu_count() or 1))
+
+# Top-left corner of a (w, h) mark on an (iw, ih) image, 20px from the edges;
+# unknown positions fall back to top-left
+POSITIONS = {
+    'center': lambda iw, ih, w, h: ((iw - w) // 2, (ih - h) // 2),
+    'top-left': lambda iw, ih, w, h: (20, 20),
+    'top-right': lambda iw, ih, w, h: (iw - w - 20, 20),
+    'bottom-left': lambda iw, ih, w, h: (20, ih - h - 20),
+    'bottom-right': lambda iw, ih, w, h: (iw - w - 20, ih - h - 20),
+}
+
+# Text anchor (see Pillow's "Text anchors") and anchor point on an (iw, ih)
+# image; the text's ascender/descender line keeps the 20px margin
+TEXT_ANCHORS = {
+    'center': ('mm', lambda iw, ih: (iw // 2, ih // 2)),
+    'top-left': ('la', lambda iw, ih: (20, 20)),
+    'top-right': ('ra', lambda iw, ih: (iw - 20, 20)),
+    'bottom-left': ('ld', lambda iw, ih: (20, ih - 20)),
+    'bottom-right': ('rd', lambda iw, ih: (iw - 20, ih - 20)),
+}
+
+
+def place(position, image_size, mark_size):
+    """Where to put a watermark of mark_size on an image of image_size"""
+    return POSITIONS.get(position, POSITIONS['top-left'])(*image_size, *mark_size)
+
+
+def text_anchor(position, image_size):
+    """Anchor name and anchor point for text at position"""
+    anchor, point = TEXT_ANCHORS.get(position, TEXT_ANCHORS['top-left'])
+    return anchor, point(*image_size)
+
+
+@functools.lru_cache(maxsize=32)
+def get_font(path, size):
+    """Load a TrueType font once per (path, size); fall back to default if not available"""
+    try:
+        return ImageFont.truetype(path, size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def add_text(image_data, raw_info, text, position, font_size, color, opacity, raw_output=False):
+    """Process pool worker: stamp text on an image; returns (image_data, raw_info or None)"""
+    image = load_image(image_data, raw_info).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    
+    font = get_font("arial.ttf", font_size)
+    
+    # Parse color (hex to RGB)
+    color = color.lstrip('#')
+    rgb = tuple(int(color[i:i+2], 16) for i in (0, 2, 4))
+    alpha = int(255 * opacity)
+    rgba_color = rgb + (alpha,)
+    
+    # Text position
+    if isinstance(font, ImageFont.FreeTypeFont):
+        # Pillow aligns the text to the anchor point itself
+        anchor, (x, y) = text_anchor(position, image.size)
+    else:
+        # Bitmap fonts only support the default top-left anchor, so measure
+        # the text and place its box instead
+        bbox = draw.textbbox((0, 0), text, font=font)
+        x, y = place(position, image.size, (bbox[2] - bbox[0], bbox[3] - bbox[1]))
+        anchor = None
+    
+    if alpha == 255:
+        # Opaque text: draw straight onto the image
+        draw.text((x, y), text, font=font, fill=rgb, anchor=anchor)
+    else:
+        # Draw on a transparent overlay just big enough for the text and
+        # paste it with its own alpha as the mask (same pixels as
+        # compositing a full-size RGBA overlay, without touching the rest)
+        bbox = draw.textbbox((x, y), text, font=font, anchor=anchor)
+        overlay = Image.new('RGBA', (bbox[2] - bbox[0], bbox[3] - bbox[1]), (255, 255, 255, 0))
+        ImageDraw.Draw(overlay).text((x - bbox[0], y - bbox[1]), text, font=font,
+                                     fill=rgba_color, anchor=anchor)
+        image.paste(overlay, bbox[:2], overlay)
+    watermarked = image
+    
+    # Convert to bytes
+    return dump_image(watermarked, raw_output)
+
+
+def add_logo(image_data, logo_data, position, scale, opacity):
+    """Process pool worker: paste a scaled, faded logo on an image; returns PNG bytes"""
+    # Load base image and logo
+    image = Image.open(BytesIO(image_data)).convert('RGB')
+    logo = Image.open(BytesIO(logo_data)).convert('RGBA')
+    
+    # Scale logo
+    scaled_width = int(image.width * scale)
+    scaled_height = int(logo.height * (scaled_width / logo.width))
+    logo = logo.resize((scaled_width, scaled_height), Image.Resampling.LANCZOS)
+    
+    # Adjust logo opacity (Image.point looks a 256-entry table up per pixel;
+    # only the alpha band is extracted, not all four)
+    alpha = logo.getchannel('A').point([int(p * opacity) for p in range(256)])
+    logo.putalpha(alpha)
+    
+    # Calculate position
+    x, y = place(position, image.size, logo.size)
+    
+    # Paste logo onto image (its alpha is the mask, so the base needs none)
+    image.paste(logo, (x, y), logo)
+    watermarked = image
+    
+    # Convert to bytes
+    watermarked_bytes, _ = dump_image(watermarked)
+    return watermarked_bytes
 
 
 class WatermarkServiceServicer(image_processing_pb2_grpc.WatermarkServiceServicer):
+    def __init__(self, pool):
+        # Decoding, drawing and encoding run in worker processes so they are
+        # not serialized by the GIL
+        self.pool = pool
+        # Retries and repeated images skip the render and composite
+        self.cache = ResultCache()
+        # Calls past this many wait here rather than piling images on the pool
+        self.slots = asyncio.Semaphore(MAX_CONCURRENT_RPCS)
     
-    def AddTextWatermark(self, request, context):
+    async def AddTextWatermark(self, request, context):
         """Add text watermark to image"""
-        print(f"[WatermarkService] Adding text '{request.text}' at {request.position}")
+        logger.info("[WatermarkService] Adding text '%s' at %s", request.text, request.position)
         
         start_time = time.time()
         
         try:
-            # Load image
-            image = Image.open(BytesIO(request.image_data)).convert('RGBA')
-            
-            # Create transparent overlay
-            overlay = Image.new('RGBA', image.size, (255, 255, 255, 0))
-            draw = ImageDraw.Draw(overlay)
-            
-            # Try to load a font, fall back to default if not available
-            try:
-                font = ImageFont.truetype("arial.ttf", request.font_size)
-            except:
-                font = ImageFont.load_default()
-            
-            # Parse color (hex to RGB)
-            color = request.color.lstrip('#')
-            rgb = tuple(int(color[i:i+2], 16) for i in (0, 2, 4))
-            alpha = int(255 * request.opacity)
-            rgba_color = rgb + (alpha,)
-            
-            # Calculate text position
-            bbox = draw.textbbox((0, 0), request.text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            
-            if request.position == 'center':
-                x = (image.width - text_width) // 2
-                y = (image.height - text_height) // 2
-            elif request.position == 'top-left':
-                x, y = 20, 20
-            elif request.position == 'top-right':
-                x = image.width - text_width - 20
-                y = 20
-            elif request.position == 'bottom-left':
-                x = 20
-                y = image.height - text_height - 20
-            elif request.position == 'bottom-right':
-                x = image.width - text_width - 20
-                y = image.height - text_height - 20
-            else:
-                x, y = 20, 20
+            # Load image (read the bytes field once - each access makes a copy)
+            image_data = request.image_data
+            cache_key = await self.cache.key_async(image_data, request.raw_info.SerializeToString(),
+                                                   request.text, request.position, request.font_size,
+                                                   request.color, request.opacity, request.raw_output)
+            response = self.cache.get(cache_key)
+            if response is not None:
+                response.processing_time_ms = int((time.time() - start_time) * 1000)
+                logger.debug("  ♻️  Cached result reused for image_id=%s", request.image_id)
+                return response
             
-            # Draw text
-            draw.text((x, y), request.text, font=font, fill=rgba_color)
-            
-            # Composite overlay with original image
-            watermarked = Image.alpha_composite(image, overlay)
-            watermarked = watermarked.convert('RGB')
-            
-            # Convert to bytes
-            output_buffer = BytesIO()
-            watermarked.save(output_buffer, format='PNG')
-            watermarked_bytes = output_buffer.getvalue()
+            raw_info = request.raw_info if request.HasField('raw_info') else None
+            async with self.slots:
+                watermarked_bytes, raw_info = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, add_text, image_data, raw_info, request.text, request.position,
+                    request.font_size, request.color, request.opacity, request.raw_output
+                )
             
             processing_time = int((time.time() - start_time) * 1000)
             
-            print(f"{'='*60}")
-            print(f"✅ WATERMARK COMPLETE")
-            print(f"{'='*60}")
-            print(f"   Text:          '{request.text}'")
-            print(f"   Position:      {request.position}")
-            print(f"   Opacity:       {request.opacity:.2f}")
-            print(f"   Image ID:      {request.image_id}")
-            print(f"   Input size:    {len(request.image_data):,} bytes")
-            print(f"   Output size:   {len(watermarked_bytes):,} bytes")
-            print(f"   Processing:    {processing_time}ms")
-            print(f"{'='*60}\n")
+            logger.debug("✅ WATERMARK COMPLETE: '%s' at %s opacity=%.2f image_id=%s, %d -> %d bytes in %dms",
+                         request.text, request.position, request.opacity, request.image_id,
+                         len(image_data), len(watermarked_bytes), processing_time)
             
-            return image_processing_pb2.WatermarkResponse(
+            response = image_processing_pb2.WatermarkResponse(
                 success=True,
                 message="Text watermark added",
                 watermarked_image=watermarked_bytes,
-                processing_time_ms=processing_time
+                processing_time_ms=processing_time,
+                raw_info=raw_info
             )
+            self.cache.put(cache_key, response)
+            return response
             
         except Exception as e:
             processing_time = int((time.time() - start_time) * 1000)
-            print(f"  ❌ Error: {str(e)}")
+            logger.error("  ❌ Error: %s", e)
             return image_processing_pb2.WatermarkResponse(
                 success=False,
                 message=f"Watermark failed: {str(e)}",
@@ -114,56 +202,21 @@ class WatermarkServiceServicer(image_processing_pb2_grpc.WatermarkServiceService
                 processing_time_ms=processing_time
             )
     
-    def AddLogoWatermark(self, request, context):
+    async def AddLogoWatermark(self, request, context):
         """Add logo watermark to image"""
-        print(f"[WatermarkService] Adding logo at {request.position}")
+        logger.info("[WatermarkService] Adding logo at %s", request.position)
         
         start_time = time.time()
         
         try:
-            # Load base image and logo
-            image = Image.open(BytesIO(request.image_data)).convert('RGBA')
-            logo = Image.open(BytesIO(request.logo_data)).convert('RGBA')
-            
-            # Scale logo
-            scaled_width = int(image.width * request.scale)
-            scaled_height = int(logo.height * (scaled_width / logo.width))
-            logo = logo.resize((scaled_width, scaled_height), Image.Resampling.LANCZOS)
-            
-            # Adjust logo opacity
-            alpha = logo.split()[3]
-            alpha = alpha.point(lambda p: int(p * request.opacity))
-            logo.putalpha(alpha)
-            
-            # Calculate position
-            if request.position == 'center':
-                x = (image.width - logo.width) // 2
-                y = (image.height - logo.height) // 2
-            elif request.position == 'top-left':
-                x, y = 20, 20
-            elif request.position == 'top-right':
-                x = image.width - logo.width - 20
-                y = 20
-            elif request.position == 'bottom-left':
-                x = 20
-                y = image.height - logo.height - 20
-            elif request.position == 'bottom-right':
-                x = image.width - logo.width - 20
-                y = image.height - logo.height - 20
-            else:
-                x, y = 20, 20
-            
-            # Paste logo onto image
-            image.paste(logo, (x, y), logo)
-            watermarked = image.convert('RGB')
-            
-            # Convert to bytes
-            output_buffer = BytesIO()
-            watermarked.save(output_buffer, format='PNG')
-            watermarked_bytes = output_buffer.getvalue()
+            async with self.slots:
+                watermarked_bytes = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, add_logo, request.image_data, request.logo_data, request.position,
+                    request.scale, request.opacity
+                )
             
             processing_time = int((time.time() - start_time) * 1000)
-            print(f"  ✅ Logo watermark added in {processing_time}ms")
+            logger.debug("  ✅ Logo watermark added in %dms", processing_time)
             
             return image_processing_pb2.WatermarkResponse(
                 success=True,
@@ -174,7 +227,7 @@ class WatermarkServiceServicer(image_processing_pb2_grpc.WatermarkServiceService
             
         except Exception as e:
             processing_time = int((time.time() - start_time) * 1000)
-            print(f"  ❌ Error: {str(e)}")
+            logger.error("  ❌ Error: %s", e)
             return image_processing_pb2.WatermarkResponse(
                 success=False,
                 message=f"Logo watermark failed: {str(e)}",
@@ -183,17 +236,22 @@ class WatermarkServiceServicer(image_processing_pb2_grpc.WatermarkServiceService
             )
 
 
-def serve(port=50054):
+async def serve(port=50054):
     """Start the Watermark Service server"""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Handlers are coroutines that await the pool; watermarking uses every core.
+    # Spawn the workers: forking a process that is running gRPC is unsafe.
+    pool = futures.ProcessPoolExecutor(max_workers=WATERMARK_WORKERS,
+                                       mp_context=multiprocessing.get_context('spawn'))
+    server = grpc.aio.server(options=GRPC_OPTIONS)
     image_processing_pb2_grpc.add_WatermarkServiceServicer_to_server(
-        WatermarkServiceServicer(), server
+        WatermarkServiceServicer(pool), server
     )
     server.add_insecure_port(f'[::]:{port}')
-    server.start()
-    print(f"🏷️  Watermark Service started on port {port}\n")
-    server.wait_for_termination()
+    await server.start()
+    logger.info("🏷️  Watermark Service started on port %d", port)
+    await server.wait_for_termination()
 
 
 if __name__ == '__main__':
-    serve()
+    configure_logging()
+    asyncio.run(serve())